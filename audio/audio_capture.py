@@ -0,0 +1,126 @@
+import logging
+import numpy as np
+
+try:
+    import pyaudio
+except ImportError:  # Only needed for live microphone capture
+    pyaudio = None
+
+
+class AudioRingBuffer:
+    """Preallocated int16 ring with a single writer and independent reader cursors.
+
+    The writer copies samples in first and only then advances ``write_pos``, so a
+    reader never sees unwritten data. No lock is taken: the only shared value is the
+    integer position, which is replaced atomically. A reader that falls more than
+    ``capacity`` samples behind skips ahead and is told how many samples it lost.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._written = 0
+
+    @property
+    def write_pos(self) -> int:
+        return self._written
+
+    def write(self, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+        m = len(samples)
+        start = (self._written + n - m) % self.capacity
+        first = min(m, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if first < m:
+            self._buffer[:m - first] = samples[first:]
+        self._written += n
+
+    def read_since(self, pos: int, block: int = 1):
+        """Return ``(samples, new_pos, lost)`` for whole ``block``-sized runs written after ``pos``."""
+        end = self._written
+        lost = 0
+        if end - pos > self.capacity:
+            lost = end - self.capacity - pos
+            pos = end - self.capacity
+        n = (end - pos) // block * block
+        if n == 0:
+            return self._buffer[:0].copy(), pos, lost
+        start = pos % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            samples = self._buffer[start:start + n].copy()
+        else:
+            samples = np.concatenate((self._buffer[start:], self._buffer[:n - first]))
+        return samples, pos + n, lost
+
+
+class MicrophoneCapture:
+    """Streams the first working PyAudio input device into an AudioRingBuffer via callback mode."""
+
+    def __init__(self, rate=44100, channels=1, chunk_size=1024, buffer_seconds=2.0):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.ring = AudioRingBuffer(int(rate * buffer_seconds))
+        self.overflows = 0
+        self.audio = None
+        self.stream = None
+        self.is_active = False
+
+        if pyaudio is None:
+            self.logger.warning("SoundDetector: PyAudio not installed. Sound detection disabled.")
+            return
+
+        try:
+            self.audio = pyaudio.PyAudio()
+            for i in range(self.audio.get_device_count()):
+                device_info = self.audio.get_device_info_by_index(i)
+                if device_info['maxInputChannels'] > 0:
+                    try:
+                        self.stream = self.audio.open(
+                            format=pyaudio.paInt16,
+                            channels=self.channels,
+                            rate=self.rate,
+                            input=True,
+                            frames_per_buffer=self.chunk_size,
+                            input_device_index=i,
+                            stream_callback=self._on_audio
+                        )
+                        self.is_active = True
+                        self.logger.info(f"SoundDetector: Using input device: {device_info['name']}")
+                        break
+                    except Exception as e:
+                        self.logger.warning(f"SoundDetector: Failed to open device {device_info['name']}: {str(e)}")
+                        continue
+
+            if not self.is_active:
+                self.logger.warning("SoundDetector: No valid audio input device found. Sound detection disabled.")
+        except Exception as e:
+            self.logger.error(f"SoundDetector: Error initializing PyAudio: {str(e)}. Sound detection disabled.")
+            self.is_active = False
+        finally:
+            if not self.is_active and self.audio:
+                self.audio.terminate()
+                self.audio = None
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: copy the chunk into the ring and return immediately."""
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        return None, pyaudio.paContinue
+
+    def close(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.audio:
+            self.audio.terminate()
+            self.audio = None
+        self.is_active = False
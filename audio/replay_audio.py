@@ -0,0 +1,25 @@
+from .audio_capture import AudioRingBuffer
+
+
+class ReplayAudioSource:
+    """Stand-in for MicrophoneCapture that is fed recorded audio instead of a device.
+
+    SoundDetector only drains ``ring``. ReplayCameraManager reads the recording in one
+    pass and calls ``feed`` for each audio chunk when its timestamp is due, so audio
+    and video stay in step whatever the replay speed.
+    """
+
+    def __init__(self, rate=44100, channels=1, chunk_size=1024, buffer_seconds=2.0):
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.ring = AudioRingBuffer(int(rate * buffer_seconds))
+        self.overflows = 0
+        self.is_active = True
+
+    def feed(self, samples):
+        if self.is_active:
+            self.ring.write(samples)
+
+    def close(self):
+        self.is_active = False
@@ -0,0 +1,76 @@
+import numpy as np
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_BANDS: Tuple[Tuple[float, float], ...] = (
+    (0.0, 250.0),       # rumble, HVAC, handling noise
+    (250.0, 1000.0),    # cry fundamental
+    (1000.0, 4000.0),   # cry harmonics, speech
+    (4000.0, 22050.0),  # hiss
+)
+
+
+class SpectralFeatures(NamedTuple):
+    """Per-chunk features; every field has one entry per analysed chunk."""
+    rms: np.ndarray            # (n,) RMS amplitude of the raw samples
+    band_energies: np.ndarray  # (n, n_bands) spectral power per band
+    dominant_freq: np.ndarray  # (n,) strongest bin inside the cry band, Hz
+    centroid: np.ndarray       # (n,) spectral centroid, Hz
+    cry_ratio: np.ndarray      # (n,) cry-band power / total power
+
+
+class SpectralEngine:
+    """Batched real-FFT analysis of fixed-size int16 chunks.
+
+    Window, bin frequencies and band bin ranges are computed once; ``analyze``
+    then handles a whole ``(n_chunks, chunk_size)`` batch with a single ``rfft``.
+    """
+
+    def __init__(self, rate: int, chunk_size: int, cry_band=(250.0, 1000.0),
+                 bands: Optional[Sequence[Tuple[float, float]]] = None, window: bool = True):
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.freqs = np.fft.rfftfreq(chunk_size, d=1.0 / rate).astype(np.float32)
+        self.window = np.hanning(chunk_size).astype(np.float32) if window else None
+        self.bands = tuple(bands or DEFAULT_BANDS)
+        self._band_slices = [self._bin_slice(lo, hi) for lo, hi in self.bands]
+        self._cry_slice = self._bin_slice(*cry_band)
+        self._cry_freqs = self.freqs[self._cry_slice]
+
+    def _bin_slice(self, lo: float, hi: float) -> slice:
+        """Contiguous bin range with ``lo <= freq <= hi``."""
+        start = int(np.searchsorted(self.freqs, lo, side="left"))
+        stop = int(np.searchsorted(self.freqs, hi, side="right"))
+        return slice(start, stop)
+
+    def analyze(self, chunks) -> SpectralFeatures:
+        """Analyse int16 samples shaped ``(n_chunks, chunk_size)`` (or flat, length a multiple of it)."""
+        x = np.asarray(chunks, dtype=np.float32).reshape(-1, self.chunk_size)
+        n = x.shape[0]
+        if n == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return SpectralFeatures(empty, np.zeros((0, len(self.bands)), dtype=np.float32),
+                                    empty, empty, empty)
+
+        # float32 before squaring: int16**2 wraps around
+        rms = np.sqrt(np.mean(np.square(x), axis=1))
+
+        spectrum = np.fft.rfft(x * self.window if self.window is not None else x, axis=1)
+        power = np.square(spectrum.real) + np.square(spectrum.imag)
+
+        band_energies = np.empty((n, len(self._band_slices)), dtype=np.float32)
+        for i, band in enumerate(self._band_slices):
+            band_energies[:, i] = power[:, band].sum(axis=1)
+
+        total = power.sum(axis=1)
+        safe_total = np.maximum(total, np.finfo(np.float32).tiny)
+        centroid = (power @ self.freqs) / safe_total
+
+        cry_power = power[:, self._cry_slice]
+        if cry_power.shape[1]:
+            dominant_freq = self._cry_freqs[np.argmax(cry_power, axis=1)]
+            cry_ratio = cry_power.sum(axis=1) / safe_total
+        else:
+            dominant_freq = np.zeros(n, dtype=np.float32)
+            cry_ratio = np.zeros(n, dtype=np.float32)
+
+        return SpectralFeatures(rms, band_energies, dominant_freq, centroid, cry_ratio)
@@ -0,0 +1,79 @@
+"""Compare detection throughput and latency in thread mode and process mode.
+
+Runs DetectionWorker.step on the same lores frames with every detector due on every
+tick, first with all detectors in-process, then with the chosen ones in worker
+processes. "main CPU" is CPU time spent in the main process per tick: what is left of
+it is what the GIL can give to Flask and encoding.
+
+    python -m benchmarks.bench_execution_modes --frames 200 --image face.png --remote eyes motion
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from camera.frame_context import FrameContext
+from detectors.eyes_detector import EyeDetector
+from detectors.motion_detector import MotionDetector
+from detectors.sound_detector import SoundDetector
+from pipeline.detection_worker import DetectionWorker
+from pipeline.detector_scheduler import DetectorScheduler
+from pipeline.process_executor import RemoteDetector
+
+
+def lores_frames(image_path, width, height, frames):
+    """I420 frames of ``image_path`` (or noise) with a little jitter so motion is non-zero."""
+    if image_path:
+        base = cv2.resize(cv2.imread(image_path), (width, height))
+    else:
+        base = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        shifted = np.roll(base, (i % 5) - 2, axis=1)
+        yield cv2.cvtColor(shifted, cv2.COLOR_BGR2YUV_I420)
+
+
+def build(kind, remote, lores_shape):
+    classes = {"eyes": EyeDetector, "motion": MotionDetector, "sound": SoundDetector}
+    if kind in remote:
+        return RemoteDetector(kind, lores_shape if kind != "sound" else None)
+    return classes[kind]()
+
+
+def run(mode, remote, frames, lores_shape):
+    detectors = [build(kind, remote, lores_shape) for kind in ("eyes", "motion", "sound")]
+    worker = DetectionWorker(None, *detectors, scheduler=DetectorScheduler(base_interval=0.0))
+    latencies = []
+    wall, cpu = time.perf_counter(), time.process_time()
+    for i, yuv in enumerate(frames):
+        start = time.perf_counter()
+        worker.step(FrameContext(yuv, timestamp=i / 30.0))
+        latencies.append(time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    for detector in detectors:
+        if hasattr(detector, "cleanup"):
+            detector.cleanup()
+
+    ticks = len(latencies)
+    latencies = np.array(latencies[5:]) * 1e3  # skip warm-up ticks for the percentiles
+    print(f"{mode:<8} {ticks / (wall or 1e-9):7.1f} ticks/s  latency p50 {np.percentile(latencies, 50):6.2f} ms"
+          f"  p95 {np.percentile(latencies, 95):6.2f} ms  main CPU {cpu / ticks * 1e3:6.2f} ms/tick")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--image", help="image containing a face; random noise if omitted")
+    parser.add_argument("--size", type=int, nargs=2, default=[320, 240], metavar=("W", "H"))
+    parser.add_argument("--remote", nargs="+", default=["eyes"], choices=["eyes", "motion", "sound"])
+    args = parser.parse_args()
+
+    width, height = args.size
+    lores_shape = (height * 3 // 2, width)
+    # Remote workers are forked before anything else runs, as main.py does
+    run("process", set(args.remote), lores_frames(args.image, width, height, args.frames), lores_shape)
+    run("thread", set(), lores_frames(args.image, width, height, args.frames), lores_shape)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-frame timing: legacy list-based landmark handling vs the NumPy pipeline in EyeDetector.
+
+Uses synthetic FaceMesh-shaped results, so MediaPipe itself is not needed:
+
+    python -m benchmarks.bench_landmarks --faces 2 --frames 2000
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from detectors import landmarks as lm
+
+N_POINTS = 478
+WIDTH, HEIGHT = 320, 240
+
+
+def synthetic_faces(n_faces, seed=0):
+    rng = np.random.default_rng(seed)
+    faces = []
+    for i in range(n_faces):
+        centre = rng.uniform(0.3, 0.7, 2)
+        pts = centre + rng.normal(0, 0.05 * (i + 1), (N_POINTS, 2))
+        faces.append(SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y)) for x, y in pts]))
+    return faces
+
+
+def legacy_ear(eye_landmarks):
+    eye_landmarks = np.array(eye_landmarks)
+    v1 = np.linalg.norm(eye_landmarks[1] - eye_landmarks[5])
+    v2 = np.linalg.norm(eye_landmarks[2] - eye_landmarks[4])
+    h = np.linalg.norm(eye_landmarks[0] - eye_landmarks[3])
+    return (v1 + v2) / (2.0 * h)
+
+
+def legacy_frame(faces):
+    """Largest face, both EARs, then the left EAR again for the overlay (pre-NumPy path)."""
+    largest_face = max(faces, key=lambda x:
+                       (max([p.x for p in x.landmark]) - min([p.x for p in x.landmark])) *
+                       (max([p.y for p in x.landmark]) - min([p.y for p in x.landmark])))
+    landmarks = [(p.x * WIDTH, p.y * HEIGHT) for p in largest_face.landmark]
+    left_ear = legacy_ear([landmarks[i] for i in lm.LEFT_EYE_INDICES])
+    right_ear = legacy_ear([landmarks[i] for i in lm.RIGHT_EYE_INDICES])
+    overlay_ear = legacy_ear([landmarks[i] for i in lm.LEFT_EYE_INDICES])
+    return (left_ear + right_ear) / 2.0, overlay_ear
+
+
+def numpy_frame(faces):
+    points = lm.landmarks_to_array(faces, WIDTH, HEIGHT)
+    landmarks = points[lm.largest_face_index(points)]
+    ears = lm.eye_aspect_ratios(landmarks)
+    return float(ears.mean()), ears[0]
+
+
+def per_frame_us(fn, faces, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(faces)
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--faces", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=1000)
+    args = parser.parse_args()
+
+    faces = synthetic_faces(args.faces)
+    legacy_avg, _ = legacy_frame(faces)
+    numpy_avg, _ = numpy_frame(faces)
+    assert abs(legacy_avg - numpy_avg) < 1e-3, (legacy_avg, numpy_avg)
+
+    legacy = per_frame_us(legacy_frame, faces, args.frames)
+    vectorised = per_frame_us(numpy_frame, faces, args.frames)
+    print(f"faces={args.faces} legacy={legacy:.1f} us/frame numpy={vectorised:.1f} us/frame "
+          f"speedup={legacy / vectorised:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
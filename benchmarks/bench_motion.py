@@ -0,0 +1,65 @@
+"""Benchmark the motion engines and the motion-percentage drift of each decimation factor.
+
+Feeds a synthetic crib scene (textured background, a slowly moving blob, sensor noise)
+through the default 60% ROI at 640x480 and 1280x720:
+
+    python -m benchmarks.bench_motion --frames 120 --decimations 2 4 8
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detectors.motion_engines import GaussianMotionEngine, DecimatedMotionEngine
+
+RESOLUTIONS = [(640, 480), (1280, 720)]
+
+
+def synthetic_scene(width, height, frames, seed=0):
+    """Yield grayscale frames with a blob drifting across and per-frame sensor noise."""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width), dtype=np.uint8), (0, 0), 8)
+    background = cv2.normalize(background, None, 40, 200, cv2.NORM_MINMAX)
+    radius = height // 10
+    for i in range(frames):
+        frame = background.copy()
+        # Bursts of movement separated by stillness, like a sleeping baby
+        phase = (i // 20) % 2
+        x = int(width * 0.3 + (i % 20) * width * 0.01 * phase)
+        cv2.circle(frame, (x, height // 2), radius, 230, -1)
+        noise = rng.normal(0, 3, frame.shape)
+        yield np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def run(engine, rois):
+    percentages, start = [], time.perf_counter()
+    for roi in rois:
+        percentages.append(engine.measure(roi))
+    elapsed = (time.perf_counter() - start) / len(rois)
+    return np.array(percentages), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--decimations", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    for width, height in RESOLUTIONS:
+        x, y, w, h = int(width * 0.2), int(height * 0.2), int(width * 0.6), int(height * 0.6)
+        rois = [frame[y:y + h, x:x + w] for frame in synthetic_scene(width, height, args.frames)]
+        reference, ref_time = run(GaussianMotionEngine(), rois)
+        print(f"{width}x{height}  gaussian        {ref_time * 1e3:7.3f} ms/frame  "
+              f"mean motion {reference.mean():.2f}%")
+        for d in args.decimations:
+            engine = DecimatedMotionEngine(decimation=d)
+            percentages, elapsed = run(engine, rois)
+            drift = np.abs(percentages - reference)
+            print(f"{width}x{height}  decimated x{d:<2}   {elapsed * 1e3:7.3f} ms/frame  "
+                  f"speedup {ref_time / elapsed:5.1f}x  drift mean {drift.mean():.2f} max {drift.max():.2f} "
+                  f"(blur {engine.blur_ksize})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark: legacy per-chunk complex FFT vs the batched SpectralEngine.
+
+Run from the repository root (ideally on the Pi itself):
+
+    python -m benchmarks.bench_spectral --repeat 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from audio.spectral import SpectralEngine
+
+RATE = 44100
+CHUNK = 1024
+
+
+def legacy_analyse(audio_data, rate=RATE, lo=250, hi=1000):
+    """The pre-SpectralEngine SoundDetector path, kept verbatim for comparison."""
+    amplitude = np.sqrt(np.mean(audio_data**2))
+    fft_data = np.fft.fft(audio_data)
+    freqs = np.fft.fftfreq(len(fft_data)) * rate
+    fft_magnitude = np.abs(fft_data)
+    mask = (freqs >= lo) & (freqs <= hi)
+    dominant_freq = freqs[mask][np.argmax(fft_magnitude[mask])] if np.any(mask) else 0.0
+    return amplitude, dominant_freq
+
+
+def synthetic_chunks(n_chunks, seed=0):
+    """A 440 Hz 'cry' tone with harmonics and noise, as int16 chunks."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_chunks * CHUNK) / RATE
+    signal = 3000 * np.sin(2 * np.pi * 440 * t) + 1200 * np.sin(2 * np.pi * 1320 * t)
+    signal += rng.normal(0, 300, t.shape)
+    return signal.astype(np.int16).reshape(n_chunks, CHUNK)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 4, 16, 43])
+    args = parser.parse_args()
+
+    engine = SpectralEngine(RATE, CHUNK)
+    print(f"{'chunks':>6} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}  (median per batch)")
+    for n in args.batches:
+        chunks = synthetic_chunks(n)
+        _, legacy = best_of(lambda: [legacy_analyse(c) for c in chunks], args.repeat)
+        _, batched = best_of(lambda: engine.analyze(chunks), args.repeat)
+        print(f"{n:>6} {legacy * 1e3:>10.3f} {batched * 1e3:>10.3f} {legacy / batched:>7.1f}x")
+
+    chunks = synthetic_chunks(4)
+    features = engine.analyze(chunks)
+    legacy_freqs = [legacy_analyse(c)[1] for c in chunks]
+    print(f"dominant freq legacy={legacy_freqs[0]:.0f} Hz engine={features.dominant_freq[0]:.0f} Hz, "
+          f"cry ratio={features.cry_ratio[0]:.2f}, centroid={features.centroid[0]:.0f} Hz")
+    # The legacy RMS squares int16 samples and wraps around
+    with np.errstate(invalid="ignore"):
+        legacy_rms = legacy_analyse(chunks[0])[0]
+    print(f"rms legacy={legacy_rms:.0f} engine={features.rms[0]:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Check that an ASGI ``?auto=1`` stream client reports its delivered throughput.
+
+Runs a BroadcastHub on synthetic detection results with one AsyncSubscription in auto
+mode, consumes frames on an event loop like the ASGI /video_feed route, and fails
+unless the client's adaptive throughput (and its kbit/s on the statistics page) is
+non-zero after one adaptation window:
+
+    python -m benchmarks.check_asgi_auto_throughput
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+import numpy as np
+
+from pipeline.detection_worker import DetectionResult, ResultChannel
+from streaming.asgi_server import AsyncSubscription
+from streaming.broadcast_hub import BroadcastHub
+
+
+def publish(results, fps, duration):
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    frame.flags.writeable = False
+    start = time.time()
+    seq = 0
+    while time.time() - start < duration:
+        seq += 1
+        results.publish(DetectionResult(seq=seq, timestamp=time.time(), state="Sleeping", bouncing_level=0,
+                                        eyes_open=False, eye_status="", motion_data=None, sound_data=None,
+                                        frame=frame, frame_seq=seq))
+        time.sleep(1.0 / fps)
+
+
+async def consume(sub, duration):
+    end = time.time() + duration
+    while time.time() < end:
+        await sub.next(timeout=0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=4.5, help="seconds; longer than one 3 s window")
+    args = parser.parse_args()
+
+    results = ResultChannel()
+    hub = BroadcastHub(results, fps=args.fps)
+    hub.start()
+    loop = asyncio.new_event_loop()
+    sub = hub.subscribe("check", factory=lambda cid: AsyncSubscription(cid, loop), auto=True)
+    publisher = threading.Thread(target=publish, args=(results, args.fps, args.duration), daemon=True)
+    publisher.start()
+    try:
+        loop.run_until_complete(consume(sub, args.duration))
+    finally:
+        publisher.join()
+        hub.stop()
+        loop.close()
+
+    stats = sub.stats()
+    print(f"sent {stats['sent']} frames, {sub.sent_bytes / 1024:.0f} KB, "
+          f"throughput {stats['throughput_kbps']} kbit/s ({stats['profile']})")
+    if not sub.sent_bytes or not stats["throughput_kbps"]:
+        print("FAIL: ASGI auto client reports no throughput")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
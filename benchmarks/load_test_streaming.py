@@ -0,0 +1,116 @@
+"""Load-test /video_feed with 1, 5 and 20 concurrent viewers and sample the server's CPU and memory.
+
+Start the monitor with ``server_mode = "flask"`` or ``"asgi"``, then point this at it
+and give it the server's PID (read from /proc, so run it on the Pi itself):
+
+    python -m benchmarks.load_test_streaming --url http://127.0.0.1:5000 --pid $(pgrep -f main.py)
+
+Each stage holds the viewers open for ``--duration`` seconds. It reports the server's
+CPU (% of one core), peak RSS, OS thread count and the frame rate each viewer received.
+"""
+import argparse
+import base64
+import http.client
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def process_sample(pid):
+    """Return ``(cpu_seconds, rss_mb, threads)`` for ``pid`` from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime + stime
+    rss = threads = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+            elif line.startswith("Threads:"):
+                threads = int(line.split()[1])
+    return cpu, rss, threads
+
+
+class Viewer(threading.Thread):
+    """One MJPEG client that counts the frames it receives until stopped."""
+
+    def __init__(self, url, auth_header):
+        super().__init__(daemon=True)
+        self.url = url
+        self.auth_header = auth_header
+        self.frames = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=10)
+        try:
+            conn.request("GET", "/video_feed", headers={"Authorization": self.auth_header})
+            response = conn.getresponse()
+            if response.status != 200:
+                self.error = f"HTTP {response.status}"
+                return
+            while not self._stop_event.is_set():
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                self.frames += chunk.count(b"--frame\r\n")
+        except OSError as exc:
+            self.error = str(exc)
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run_stage(url, auth_header, pid, viewers, duration):
+    clients = [Viewer(url, auth_header) for _ in range(viewers)]
+    for client in clients:
+        client.start()
+    time.sleep(1.0)  # let every viewer connect before measuring
+    cpu_start, _, _ = process_sample(pid)
+    frames_start = sum(c.frames for c in clients)
+    start = time.time()
+    peak_rss = peak_threads = 0
+    while time.time() - start < duration:
+        time.sleep(0.5)
+        _, rss, threads = process_sample(pid)
+        peak_rss, peak_threads = max(peak_rss, rss), max(peak_threads, threads)
+    elapsed = time.time() - start
+    cpu_end, _, _ = process_sample(pid)
+    frames = sum(c.frames for c in clients) - frames_start
+    for client in clients:
+        client.stop()
+    for client in clients:
+        client.join(timeout=5)
+    errors = [c.error for c in clients if c.error]
+    print(f"{viewers:3d} viewers  CPU {(cpu_end - cpu_start) / elapsed * 100:6.1f}%  RSS {peak_rss:7.1f} MB  "
+          f"threads {peak_threads:3d}  {frames / elapsed / viewers:5.1f} fps/viewer"
+          + (f"  errors: {len(errors)} ({errors[0]})" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--pid", type=int, required=True, help="PID of the server process")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="cradle123")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    auth_header = "Basic " + base64.b64encode(f"{args.user}:{args.password}".encode()).decode()
+    url = urlparse(args.url)
+    _, rss, threads = process_sample(args.pid)
+    print(f"idle       RSS {rss:7.1f} MB  threads {threads:3d}")
+    for viewers in args.viewers:
+        run_stage(url, auth_header, args.pid, viewers, args.duration)
+        time.sleep(2.0)  # let the server drop the previous stage's connections
+
+
+if __name__ == "__main__":
+    main()
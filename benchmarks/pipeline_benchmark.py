@@ -0,0 +1,249 @@
+"""End-to-end benchmark of the monitoring pipeline with per-stage latency percentiles.
+
+Replays synthetic (or recorded, see utils/recording.py) frames and audio through the
+production path: ReplayCameraManager writes each frame into a FrameRing, and the
+DetectionWorker takes its verified lores copy and runs ``step()``. Each result is then
+rendered and encoded by the BroadcastHub as a viewer would get it. Per-detector times
+come from timing the detectors' ``process`` calls inside ``step()``. "fusion" is the
+rest of the tick: classification, the bouncing level and the overlay description.
+Each configuration is run at every detection resolution and FPS. Every detector runs
+on every tick (scheduler interval 0), so numbers are comparable across commits.
+Results go to a JSON file; ``--compare`` checks them against an earlier file:
+
+    python -m benchmarks.pipeline_benchmark --frames 300 --output bench.json
+    python -m benchmarks.pipeline_benchmark --recording crib.bsq --compare bench.json --fail-over 15
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from audio.replay_audio import ReplayAudioSource
+from camera.frame_ring import FrameRing
+from camera.replay_camera import ReplayCameraManager
+from detectors.eyes_detector import EyeDetector
+from detectors.motion_detector import MotionDetector
+from detectors.sound_detector import SoundDetector
+from pipeline.detection_worker import DetectionWorker
+from pipeline.detector_scheduler import DetectorScheduler
+from streaming.broadcast_hub import BroadcastHub
+from utils.recording import LORES, MAIN, AUDIO, write_header, write_record
+
+STAGES = ["prepare", "eyes", "motion", "sound", "fusion", "encode"]
+AUDIO_RATE = 44100
+
+
+def write_synthetic_session(path, width, height, view_size, fps, frames, image=None, seed=0):
+    """Record a drifting subject, crying every 10 s, as a session file the replay camera reads."""
+    rng = np.random.default_rng(seed)
+    if image is not None:
+        base = cv2.resize(cv2.imread(image), view_size)
+    else:
+        base = cv2.GaussianBlur(rng.integers(0, 255, (view_size[1], view_size[0], 3), dtype=np.uint8), (0, 0), 6)
+    samples_per_frame = int(AUDIO_RATE / fps)
+    with open(path, "wb") as f:
+        write_header(f, {
+            "version": 1,
+            "lores_shape": [height * 3 // 2, width],
+            "main_shape": [view_size[1], view_size[0], 3],
+            "audio_rate": AUDIO_RATE,
+            "audio_channels": 1,
+            "chunk_size": 1024,
+            "started": 0.0,
+        })
+        for i in range(frames):
+            t = i / fps
+            n = np.arange(i * samples_per_frame, (i + 1) * samples_per_frame) / AUDIO_RATE
+            crying = (t % 10) > 7
+            audio = (3000 if crying else 60) * np.sin(2 * np.pi * 550 * n) + rng.normal(0, 30, len(n))
+            write_record(f, AUDIO, t, audio.astype("<i2").tobytes())
+            view = np.roll(base, int(4 * np.sin(t)), axis=1)
+            lores = cv2.cvtColor(cv2.resize(view, (width, height), interpolation=cv2.INTER_AREA),
+                                 cv2.COLOR_BGR2YUV_I420)
+            write_record(f, MAIN, t, cv2.imencode(".jpg", view)[1].tobytes())
+            write_record(f, LORES, t, cv2.imencode(".jpg", lores)[1].tobytes())
+
+
+def summarize(latencies, wall):
+    ms = np.asarray(latencies) * 1e3
+    return {
+        "count": len(ms),
+        "throughput_hz": round(len(ms) / wall, 2) if wall > 0 else None,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def timed(detector, name, tick):
+    """Time ``detector.process`` into ``tick[name]`` without changing what ``step()`` calls."""
+    process = detector.process
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return process(*args, **kwargs)
+        finally:
+            tick[name] = tick.get(name, 0.0) + time.perf_counter() - start
+    detector.process = wrapper
+
+
+def run(path, resolution, view_size, fps, jpeg_quality, warmup):
+    """Replay ``path`` through DetectionWorker.step() and the stream encode at no more than ``fps``."""
+    width, height = resolution
+    audio = ReplayAudioSource(rate=AUDIO_RATE)
+    camera = ReplayCameraManager(path, resolution=view_size, lores_resolution=resolution, speed=0,
+                                 loop=False, audio_source=audio)
+    ring = FrameRing((height * 3 // 2, width), (view_size[1], view_size[0], 3))
+    eyes, motion, sound = EyeDetector(), MotionDetector(), SoundDetector(source=audio)
+    worker = DetectionWorker(ring, eyes, motion, sound, scheduler=DetectorScheduler(base_interval=0.0))
+    hub = BroadcastHub(None, size=view_size, jpeg_quality=jpeg_quality)
+    tick = {}
+    for name, detector in (("eyes", eyes), ("motion", motion), ("sound", sound)):
+        timed(detector, name, tick)
+    timings = {stage: [] for stage in STAGES + ["pipeline"]}
+    states = {}
+
+    last, i = None, 0
+    while True:
+        try:
+            camera.capture_into(ring, with_main=True)
+        except EOFError:
+            break
+        tick.clear()
+        t0 = time.perf_counter()
+        # As DetectionWorker._run takes a frame: newest slot, verified lores copy
+        ctx = ring.latest()
+        if last is not None and ctx.timestamp - last < 1 / fps * 0.9:
+            continue
+        last = ctx.timestamp
+        ctx.lores_yuv = ring.copy_lores(ctx.slot, ctx.seq)
+        t1 = time.perf_counter()
+        result = worker.step(ctx)
+        t2 = time.perf_counter()
+        hub.encode(hub.renderer.annotated(result))
+        t3 = time.perf_counter()
+        detectors = sum(tick.get(name, 0.0) for name in ("eyes", "motion", "sound"))
+        tick.update(prepare=t1 - t0, fusion=t2 - t1 - detectors, encode=t3 - t2, pipeline=t3 - t0)
+        if i >= warmup:
+            for stage in STAGES + ["pipeline"]:
+                timings[stage].append(tick.get(stage, 0.0))
+            states[result.state] = states.get(result.state, 0) + 1
+        i += 1
+
+    sound.cleanup()
+    camera.release()
+    if not timings["pipeline"]:
+        raise SystemExit("Not enough frames after warm-up")
+    # Throughput of a stage = how many ticks/s it could sustain on its own
+    results = {stage: summarize(values, sum(values)) for stage, values in timings.items()}
+    results["states"] = states
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=False).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(current, baseline_path, threshold):
+    """Print p95 changes against ``baseline_path``; return the number of regressions over ``threshold`` %."""
+    with open(baseline_path) as f:
+        baseline = {(tuple(r["resolution"]), r["fps"]): r for r in json.load(f)["runs"]}
+    regressions = 0
+    for run_result in current["runs"]:
+        key = (tuple(run_result["resolution"]), run_result["fps"])
+        if key not in baseline:
+            continue
+        for stage in STAGES + ["pipeline"]:
+            old, new = baseline[key]["stages"][stage]["p95_ms"], run_result["stages"][stage]["p95_ms"]
+            change = (new - old) / old * 100 if old else 0.0
+            flag = ""
+            if threshold is not None and change > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{key[0][0]}x{key[0][1]}@{key[1]}fps {stage:<9} p95 {old:8.3f} -> {new:8.3f} ms "
+                  f"({change:+6.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", help="session file from SessionRecorder (synthetic if omitted)")
+    parser.add_argument("--image", help="image with a face for the synthetic session")
+    parser.add_argument("--resolutions", nargs="+", default=["320x240", "640x480"],
+                        help="detection (lores) resolutions, WxH")
+    parser.add_argument("--fps", type=float, nargs="+", default=[10, 30])
+    parser.add_argument("--frames", type=int, default=300, help="frames per synthetic run")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--view-size", default="640x480", help="stream frame size, WxH")
+    parser.add_argument("--jpeg-quality", type=int, default=50)
+    parser.add_argument("--output", default="pipeline_benchmark.json")
+    parser.add_argument("--compare", help="earlier JSON output to compare against")
+    parser.add_argument("--fail-over", type=float, help="exit 1 if any p95 regresses by more than this %%")
+    args = parser.parse_args()
+
+    view_size = tuple(int(v) for v in args.view_size.split("x"))
+    output = {"environment": environment(), "args": vars(args), "runs": []}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.split("x"))
+        for fps in args.fps:
+            if args.recording:
+                stages = run(args.recording, (width, height), view_size, fps, args.jpeg_quality, args.warmup)
+            else:
+                fd, path = tempfile.mkstemp(suffix=".bsq")
+                os.close(fd)
+                try:
+                    write_synthetic_session(path, width, height, view_size, fps, args.frames, args.image)
+                    stages = run(path, (width, height), view_size, fps, args.jpeg_quality, args.warmup)
+                finally:
+                    os.remove(path)
+            states = stages.pop("states")
+            pipeline = stages["pipeline"]
+            output["runs"].append({
+                "resolution": [width, height],
+                "fps": fps,
+                "stages": stages,
+                "states": states,
+                # Share of the frame period one tick takes at p95; above 1.0 frames are dropped
+                "p95_budget_used": round(pipeline["p95_ms"] / (1000 / fps), 3),
+            })
+            print(f"{width}x{height} @ {fps:g} fps: pipeline p50 {pipeline['p50_ms']:.2f} ms, "
+                  f"p95 {pipeline['p95_ms']:.2f} ms, p99 {pipeline['p99_ms']:.2f} ms, "
+                  f"{pipeline['throughput_hz']:.1f} ticks/s max")
+            for stage in STAGES:
+                s = stages[stage]
+                print(f"    {stage:<8} p50 {s['p50_ms']:7.3f}  p95 {s['p95_ms']:7.3f}  p99 {s['p99_ms']:7.3f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        if compare(output, args.compare, args.fail_over) and args.fail_over is not None:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
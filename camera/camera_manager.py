@@ -1,32 +1,74 @@
-from picamera2 import Picamera2
-import cv2
+import time
+
+import numpy as np
+
+try:
+    from picamera2 import Picamera2, MappedArray
+except ImportError:  # Only needed on the Pi; replay runs anywhere (camera/replay_camera.py)
+    Picamera2 = MappedArray = None
+from .frame_context import FrameContext
 from .frame_processor import FrameProcessor
 
 class CameraManager:
-    def __init__(self, resolution=(640, 480)):
+    def __init__(self, resolution=(640, 480), lores_resolution=(320, 240)):
+        if lores_resolution[0] % 64 or lores_resolution[1] % 2:
+            # Padded YUV420 rows would shift the I420 planes (see utils.config.lores_size)
+            raise ValueError(f"lores width must be a multiple of 64 and height even, got {lores_resolution}")
         # Initialize the Raspberry Pi Camera
         self.resolution = resolution
+        self.lores_resolution = lores_resolution
         self.camera = Picamera2()
-        # Configure the camera with the specified resolution
-        config = self.camera.create_video_configuration(main={"size": resolution})
+        # Main stream for viewers: "RGB888" is BGR byte order, i.e. already OpenCV's layout.
+        # Lores YUV420 stream for detectors: Y plane is grayscale for free.
+        config = self.camera.create_video_configuration(
+            main={"size": resolution, "format": "RGB888"},
+            lores={"size": lores_resolution, "format": "YUV420"}
+        )
         self.camera.configure(config)
         # Start the camera
         self.camera.start()
-        
+
         # Initialize frame processor
         self.frame_processor = FrameProcessor()
         self.is_night_mode = False
 
+    def capture(self, with_main=True):
+        """Capture a FrameContext: lores stream always, BGR main stream only when ``with_main``"""
+        if with_main:
+            (main, lores), _ = self.camera.capture_arrays(["main", "lores"])
+            ctx = FrameContext(lores, main)
+            # Process frame based on conditions
+            if self.is_night_mode:
+                ctx.set_view(self.frame_processor.enhance_night_vision(ctx))
+            return ctx
+        return FrameContext(self.camera.capture_array("lores"))
+
+    def capture_into(self, ring, with_main=True):
+        """Capture straight into the next FrameRing slot and publish it; returns its seq.
+
+        The camera buffers are mapped and copied once into the slot, instead of
+        ``capture_array`` allocating a new frame for every capture.
+        """
+        lores_slot, main_slot = ring.begin_write()
+        with_main = with_main and main_slot is not None
+        request = self.camera.capture_request()
+        try:
+            timestamp = time.time()
+            with MappedArray(request, "lores") as mapped:
+                np.copyto(lores_slot, mapped.array[:lores_slot.shape[0], :lores_slot.shape[1]])
+            if with_main:
+                with MappedArray(request, "main") as mapped:
+                    np.copyto(main_slot, mapped.array[:main_slot.shape[0], :main_slot.shape[1], :3])
+        finally:
+            request.release()
+        if with_main and self.is_night_mode:
+            ctx = FrameContext(lores_slot, main_slot, timestamp=timestamp)
+            np.copyto(main_slot, self.frame_processor.enhance_night_vision(ctx))
+        return ring.commit(timestamp, with_main)
+
     def get_frame(self):
-        # Capture a frame as a NumPy array
-        frame = self.camera.capture_array()
-        # Convert from RGB (picamera2 default) to BGR (OpenCV default)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        
-        # Process frame based on conditions
-        if self.is_night_mode:
-            frame = self.frame_processor.enhance_night_vision(frame)
-        return frame
+        # Capture a full-resolution BGR frame
+        return self.capture(with_main=True).view
 
     def toggle_night_mode(self):
         self.is_night_mode = not self.is_night_mode
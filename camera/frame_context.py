@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import time
+
+
+class FrameContext:
+    """Everything detectors need from one capture, with derived images computed at most once.
+
+    A context wraps either the lores YUV420 array from the camera (I420 layout: ``h * 3 / 2``
+    rows, Y plane first; width a multiple of 64 so rows are unpadded) or a plain BGR frame.
+    ``view`` is the full-size BGR frame viewers see; it is None when nobody is watching.
+    Every derived image (``gray``, ``rgb``, ``lab``, downscales, ROI crops) is cached on
+    first use, so any number of detectors can ask for it within the same tick.
+    """
+
+    def __init__(self, lores_yuv=None, view=None, timestamp=None, seq=None):
+        if lores_yuv is None and view is None:
+            raise ValueError("FrameContext needs a lores YUV image or a BGR view")
+        self.lores_yuv = lores_yuv
+        self.view = view
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.seq = seq    # FrameRing sequence number, when the frame came from a ring
+        self.slot = None  # FrameRing slot index holding lores_yuv
+        self._cache = {}
+
+    @classmethod
+    def from_bgr(cls, frame, timestamp=None):
+        """Context for a single BGR frame used both for detection and viewing."""
+        return cls(view=frame, timestamp=timestamp)
+
+    def memo(self, key, factory):
+        """Return the cached value for ``key``, computing it with ``factory()`` on first use."""
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = factory()
+            return value
+
+    def set_view(self, frame):
+        """Replace the viewer frame (e.g. after night enhancement); drops view-derived images."""
+        self.view = frame
+        self._cache.pop("lab", None)
+        if self.lores_yuv is None:
+            self._cache.clear()
+
+    @property
+    def gray(self):
+        """Detection grayscale: the lores Y plane (no conversion) or the view converted once."""
+        if self.lores_yuv is not None:
+            return self.lores_yuv[:self.lores_yuv.shape[0] * 2 // 3]
+        return self.memo("gray", lambda: cv2.cvtColor(self.view, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def rgb(self):
+        """Detection RGB image for FaceMesh."""
+        if self.lores_yuv is not None:
+            return self.memo("rgb", lambda: cv2.cvtColor(self.lores_yuv, cv2.COLOR_YUV2RGB_I420))
+        return self.memo("rgb", lambda: cv2.cvtColor(self.view, cv2.COLOR_BGR2RGB))
+
+    @property
+    def lab(self):
+        """LAB version of the viewer frame."""
+        return self.memo("lab", lambda: cv2.cvtColor(self.view, cv2.COLOR_BGR2LAB))
+
+    @property
+    def brightness(self) -> float:
+        """Mean grayscale brightness."""
+        return self.memo("brightness", lambda: float(np.mean(self.gray)))
+
+    @property
+    def detection_shape(self):
+        """(height, width) of the images detectors work on."""
+        return self.gray.shape[:2]
+
+    def downscaled(self, kind: str, scale: float):
+        """``gray``/``rgb`` resized by ``scale`` with area interpolation."""
+        def resize():
+            image = getattr(self, kind)
+            size = (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale)))
+            return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return self.memo(("downscaled", kind, scale), resize)
+
+    def crop(self, kind: str, roi):
+        """``(x, y, w, h)`` region of ``gray``/``rgb`` (a view into the cached image)."""
+        x, y, w, h = roi
+        return self.memo(("crop", kind, tuple(roi)), lambda: getattr(self, kind)[y:y + h, x:x + w])
+
+    def bgr(self):
+        """Best available BGR image: the view if captured, otherwise the lores stream."""
+        if self.view is not None:
+            return self.view
+        return self.memo("bgr", lambda: cv2.cvtColor(self.lores_yuv, cv2.COLOR_YUV2BGR_I420))
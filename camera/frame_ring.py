@@ -0,0 +1,144 @@
+import threading
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .frame_context import FrameContext
+
+
+class FrameRing:
+    """Fixed ring of preallocated frame slots shared by the capture loop and every reader.
+
+    Each slot holds a lores YUV420 frame and, when someone was watching, the BGR main
+    frame, plus the sequence number and capture timestamp of the frame in it. The
+    writer fills the next slot in place (``begin_write``/``commit``). Readers take
+    ``latest()`` or block in ``wait_next()``. Neither consumes the frame, so detection,
+    snapshots and streaming never steal frames from each other.
+
+    With ``shared=True`` the slots and their metadata live in ``multiprocessing.shared_memory``.
+    Worker processes forked after the ring was created can then read a slot by index
+    without a copy (``slot_context``). Readers get zero-copy views of the lores slot. A
+    slot is only rewritten ``slots`` frames later, so a reader must finish with it within
+    that many frame periods; ``is_current`` tells it whether it did. Readers that may
+    take longer (detection) take ``copy_lores`` instead, which copies the slot and
+    checks it was not overwritten meanwhile. The main frame is copied on read, because
+    overlays are drawn onto it.
+    """
+
+    def __init__(self, lores_shape: Tuple[int, int], main_shape: Optional[Tuple[int, int, int]] = None,
+                 slots: int = 4, shared: bool = False):
+        self.slots = slots
+        self.lores_shape = tuple(lores_shape)
+        self.main_shape = tuple(main_shape) if main_shape is not None else None
+        self._shm = []
+        self.lores = self._allocate((slots,) + self.lores_shape, np.uint8, shared)
+        self.main = self._allocate((slots,) + self.main_shape, np.uint8, shared) if main_shape else None
+        self.seqs = self._allocate((slots,), np.int64, shared)
+        self.timestamps = self._allocate((slots,), np.float64, shared)
+        self.has_main = self._allocate((slots,), np.bool_, shared)
+        self.seqs[:] = -1
+        self._cond = threading.Condition()
+        self._seq = 0  # sequence number of the newest committed frame; 0 = none yet
+
+    def _allocate(self, shape, dtype, shared):
+        if not shared:
+            return np.zeros(shape, dtype=dtype)
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self._shm.append(shm)
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @property
+    def shared(self) -> bool:
+        return bool(self._shm)
+
+    @property
+    def latest_seq(self) -> int:
+        return self._seq
+
+    def begin_write(self):
+        """Return ``(lores, main)`` arrays of the slot the next frame goes into."""
+        slot = (self._seq + 1) % self.slots
+        self.seqs[slot] = -1  # readers of the previous occupant now see it as stale
+        main = self.main[slot] if self.main is not None else None
+        return self.lores[slot], main
+
+    def commit(self, timestamp: float, has_main: bool) -> int:
+        """Publish the slot filled since ``begin_write`` and wake waiting readers."""
+        with self._cond:
+            seq = self._seq + 1
+            slot = seq % self.slots
+            self.timestamps[slot] = timestamp
+            self.has_main[slot] = has_main
+            self.seqs[slot] = seq
+            self._seq = seq
+            self._cond.notify_all()
+        return seq
+
+    def write(self, lores, main=None, timestamp: float = 0.0) -> int:
+        """Copy already-captured arrays into the next slot and publish them."""
+        lores_slot, main_slot = self.begin_write()
+        np.copyto(lores_slot, lores)
+        if main is not None and main_slot is not None:
+            np.copyto(main_slot, main)
+        return self.commit(timestamp, main is not None and main_slot is not None)
+
+    def is_current(self, slot: int, seq: int) -> bool:
+        """True while ``slot`` still holds frame ``seq`` (i.e. it was not overwritten)."""
+        return int(self.seqs[slot]) == seq
+
+    def copy_lores(self, slot: int, seq: int) -> Optional[np.ndarray]:
+        """Private copy of the lores frame ``seq``; None if its slot was overwritten first."""
+        if not self.is_current(slot, seq):
+            return None
+        lores = self.lores[slot].copy()
+        # Checked again after copying: a writer that started meanwhile may have torn it
+        return lores if self.is_current(slot, seq) else None
+
+    def slot_context(self, slot: int, seq: int, copy_main: bool = True) -> Optional[FrameContext]:
+        """FrameContext over ``slot`` if it still holds frame ``seq``; None if it was overwritten."""
+        if not self.is_current(slot, seq):
+            return None
+        view = None
+        timestamp = float(self.timestamps[slot])
+        if self.main is not None and self.has_main[slot]:
+            view = self.main[slot].copy() if copy_main else self.main[slot]
+            # As in copy_lores: a copy finished after the slot was reused may be torn, or
+            # pair another frame's main image with this lores one
+            if copy_main and not self.is_current(slot, seq):
+                return None
+        ctx = FrameContext(self.lores[slot], view, timestamp=timestamp, seq=seq)
+        ctx.slot = slot
+        return ctx
+
+    def latest(self, copy_main: bool = True) -> Optional[FrameContext]:
+        """Context for the newest frame, or None before the first frame."""
+        seq = self._seq
+        if seq == 0:
+            return None
+        return self.slot_context(seq % self.slots, seq, copy_main)
+
+    def wait_next(self, after_seq: int, timeout: Optional[float] = None,
+                  copy_main: bool = True) -> Optional[FrameContext]:
+        """Block until a frame newer than ``after_seq`` exists and return the newest; None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout):
+                return None
+        return self.latest(copy_main)
+
+    def close(self, unlink: bool = True):
+        """Release the shared-memory blocks (the creating process also unlinks them)."""
+        # Views into the blocks must be gone before they can be closed
+        self.lores = self.main = self.seqs = self.timestamps = self.has_main = None
+        for shm in self._shm:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # a reader still holds a view; the mapping goes away with the process
+            if unlink:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+        self._shm = []
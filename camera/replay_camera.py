@@ -0,0 +1,107 @@
+import logging
+
+import cv2
+
+from utils.recording import SessionReader, ReplayClock, LORES, MAIN, AUDIO
+from .frame_context import FrameContext
+from .frame_processor import FrameProcessor
+
+
+class ReplayCameraManager:
+    """Plays a SessionRecorder file back through the CameraManager interface.
+
+    The recording is read in one pass. Audio chunks go to ``audio_source``, a
+    ReplayAudioSource, as their time comes. With ``speed`` 0 nothing waits, and
+    ``lockstep`` tells the capture loop to let detection finish each frame first, so a
+    run analyses every recorded frame and is repeatable. Without ``loop`` a finished
+    recording raises EOFError from ``capture``.
+    """
+
+    def __init__(self, path, resolution=(640, 480), lores_resolution=(320, 240), speed=1.0,
+                 loop=True, audio_source=None):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.resolution = resolution
+        self.lores_resolution = lores_resolution
+        self.reader = SessionReader(path)
+        self.clock = ReplayClock(speed)
+        self.lockstep = speed <= 0
+        self.loop = loop
+        self.audio_source = audio_source
+        self.frame_processor = FrameProcessor()
+        self.is_night_mode = False
+        self.finished = False
+        self._pending_main = None
+        self._last_timestamp = None
+        self._frame_period = 1 / 30
+        self._rewound = False
+
+        header = self.reader.header
+        if audio_source is not None and header.get("audio_rate") != audio_source.rate:
+            self.logger.warning(f"Replay audio is {header.get('audio_rate')} Hz, "
+                                f"sound detector expects {audio_source.rate} Hz")
+        self.logger.info(f"Replaying {path} (speed={speed or 'max'}, loop={loop})")
+
+    def _next_frame(self):
+        """Read up to the next lores frame, feeding audio on the way; returns (lores, main, ts)."""
+        while True:
+            try:
+                record = next(self.reader)
+            except StopIteration:
+                if not self.loop or self._last_timestamp is None:
+                    self.finished = True
+                    raise EOFError("Replay finished")
+                self.reader.rewind()
+                self._rewound = True
+                continue
+            if self._rewound:
+                # Keep replay time moving forward across the loop
+                self.clock.rebase(record.timestamp, self._last_timestamp + self._frame_period)
+                self._rewound = False
+            timestamp = self.clock.timestamp(record.timestamp)
+            self.clock.wait_until(timestamp)
+            if record.kind == AUDIO:
+                if self.audio_source is not None:
+                    self.audio_source.feed(record.data)
+            elif record.kind == MAIN:
+                self._pending_main = record.data
+            elif record.kind == LORES:
+                main, self._pending_main = self._pending_main, None
+                if self._last_timestamp is not None and timestamp > self._last_timestamp:
+                    self._frame_period = timestamp - self._last_timestamp
+                self._last_timestamp = timestamp
+                return self._fit_lores(record.data), main, timestamp
+
+    def _fit_lores(self, lores):
+        width, height = self.lores_resolution
+        if lores.shape == (height * 3 // 2, width):
+            return lores
+        bgr = cv2.resize(cv2.cvtColor(lores, cv2.COLOR_YUV2BGR_I420), (width, height))
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+
+    def _view(self, lores, main):
+        """Recorded main frame, or the lores frame scaled up when it was not recorded."""
+        if main is None:
+            main = cv2.cvtColor(lores, cv2.COLOR_YUV2BGR_I420)
+        if main.shape[1::-1] != tuple(self.resolution):
+            main = cv2.resize(main, tuple(self.resolution))
+        if self.is_night_mode:
+            main = self.frame_processor.enhance_night_vision(FrameContext(lores, main))
+        return main
+
+    def capture(self, with_main=True):
+        lores, main, timestamp = self._next_frame()
+        return FrameContext(lores, self._view(lores, main) if with_main else None, timestamp=timestamp)
+
+    def capture_into(self, ring, with_main=True):
+        lores, main, timestamp = self._next_frame()
+        view = self._view(lores, main) if with_main else None
+        return ring.write(lores, view, timestamp)
+
+    def get_frame(self):
+        return self.capture(with_main=True).view
+
+    def toggle_night_mode(self):
+        self.is_night_mode = not self.is_night_mode
+
+    def release(self):
+        self.reader.close()
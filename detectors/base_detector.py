@@ -3,7 +3,8 @@ class BaseDetector:
         self.is_active = True
         self.last_detection_time = None
 
-    def process(self, frame):
+    def process(self, ctx):
+        """Analyse one FrameContext; derived images should come from ``ctx`` so they are shared"""
         raise NotImplementedError
 
     def toggle(self):
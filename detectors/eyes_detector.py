@@ -2,10 +2,16 @@ import cv2
 import numpy as np
 import mediapipe as mp
 from .base_detector import BaseDetector
+from . import landmarks as lm
 import time
 
 class EyeDetector(BaseDetector):
-    def __init__(self):
+    # Define indices for eyes and mouth
+    LEFT_EYE_INDICES = lm.LEFT_EYE_INDICES
+    RIGHT_EYE_INDICES = lm.RIGHT_EYE_INDICES
+    MOUTH_INDICES = lm.MOUTH_INDICES
+
+    def __init__(self, tracking=True, reacquire_interval=5.0, track_margin=0.5):
         super().__init__()
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
@@ -14,6 +20,21 @@ class EyeDetector(BaseDetector):
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
+        # Second instance for the tracked crop so its temporal state isn't mixed with full-frame searches
+        self.roi_face_mesh = self.mp_face_mesh.FaceMesh(
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.tracking = tracking
+        self.reacquire_interval = reacquire_interval  # Seconds between forced full-frame searches
+        self.track_margin = track_margin  # Crop expansion, as a fraction of face size per side
+        self.min_track_fill = 0.15  # Face must cover this much of the crop to be trusted
+        self.track_roi = None  # (x0, y0, x1, y1) in detection coordinates
+        self.last_full_search = 0.0
+        self.track_hits = 0
+        self.full_searches = 0
         self.calibration_frames = []
         self.calibration_duration = 60  # Increased calibration duration
         self.open_eye_threshold = None
@@ -24,20 +45,13 @@ class EyeDetector(BaseDetector):
         self.brightness_window = 10
         self.ear_smoothing_window = 5
         self.ear_history = []
+        self.last_landmarks = None  # (478, 2) float32 in detection coordinates
+        self.last_ears = None  # (left, right) EAR of last_landmarks
+        self.last_status_text = ""
 
-    def calculate_ear(self, eye_landmarks):
-        """Calculate Eye Aspect Ratio (EAR) with NumPy arrays"""
-        eye_landmarks = np.array(eye_landmarks)
-        v1 = np.linalg.norm(eye_landmarks[1] - eye_landmarks[5])
-        v2 = np.linalg.norm(eye_landmarks[2] - eye_landmarks[4])
-        h = np.linalg.norm(eye_landmarks[0] - eye_landmarks[3])
-        ear = (v1 + v2) / (2.0 * h)
-        return ear
-
-    def check_lighting(self, frame):
-        """Check and enhance frame lighting dynamically"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        brightness = np.mean(gray)
+    def check_lighting(self, ctx):
+        """Check lighting on the shared grayscale image; return the RGB image FaceMesh should see"""
+        brightness = ctx.brightness
 
         self.brightness_history.append(brightness)
         if len(self.brightness_history) > self.brightness_window:
@@ -48,30 +62,75 @@ class EyeDetector(BaseDetector):
         clip_limit = max(1.0, 4.0 - (avg_brightness / 50.0))
         if avg_brightness < 40:
             clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
-            gray = clahe.apply(gray)
-            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-        return frame
-
-    def detect_eye_state(self, frame):
-        """Detect eye state with occlusion handling and smoothed EAR"""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            gray = clahe.apply(ctx.gray)
+            return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+        return ctx.rgb
+
+    def _update_track_roi(self, landmarks, frame_shape):
+        """Expand the landmark bounding box by ``track_margin`` and clip it to the frame"""
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = lm.bounding_boxes(landmarks[None])[0]
+        mx = max(x1 - x0, 16) * self.track_margin
+        my = max(y1 - y0, 16) * self.track_margin
+        self.track_roi = (max(0, int(x0 - mx)), max(0, int(y0 - my)),
+                          min(width, int(x1 + mx)), min(height, int(y1 + my)))
+
+    def _track_is_confident(self, landmarks, roi, frame_shape):
+        """Trust a crop result only if the face sits inside the crop and fills enough of it"""
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = roi
+        fx0, fy0, fx1, fy1 = lm.bounding_boxes(landmarks[None])[0]
+        # A face touching a crop edge has probably moved out of it, unless that edge is the frame's
+        inside = (fx0 > x0 or x0 == 0) and (fy0 > y0 or y0 == 0) and \
+                 (fx1 < x1 or x1 == width) and (fy1 < y1 or y1 == height)
+        fill = ((fx1 - fx0) * (fy1 - fy0)) / max(1, (x1 - x0) * (y1 - y0))
+        return inside and fill >= self.min_track_fill
+
+    def locate_face(self, frame_rgb, current_time):
+        """Return full-frame ``(478, 2)`` landmarks of the baby's face, or None.
+
+        While tracking, FaceMesh only sees the crop around the previous face and the
+        landmarks are mapped back to ``frame_rgb`` coordinates. A full-frame search runs
+        when there is no track, the crop result is not confident, or every
+        ``reacquire_interval`` seconds.
+        """
+        if self.tracking and self.track_roi is not None and \
+                current_time - self.last_full_search < self.reacquire_interval:
+            x0, y0, x1, y1 = self.track_roi
+            crop = np.ascontiguousarray(frame_rgb[y0:y1, x0:x1])
+            results = self.roi_face_mesh.process(crop)
+            if results.multi_face_landmarks:
+                landmarks = lm.landmarks_to_array(results.multi_face_landmarks[:1],
+                                                  x1 - x0, y1 - y0, x0, y0)[0]
+                if self._track_is_confident(landmarks, self.track_roi, frame_rgb.shape):
+                    self.track_hits += 1
+                    self._update_track_roi(landmarks, frame_rgb.shape)
+                    return landmarks
+
+        self.last_full_search = current_time
+        self.full_searches += 1
         results = self.face_mesh.process(frame_rgb)
-        current_time = time.time()
+        if not results.multi_face_landmarks:
+            self.track_roi = None
+            return None
 
-        if results.multi_face_landmarks:
-            self.face_absent_timer = current_time
+        faces = lm.landmarks_to_array(results.multi_face_landmarks, frame_rgb.shape[1], frame_rgb.shape[0])
+        landmarks = faces[lm.largest_face_index(faces)]
+        self._update_track_roi(landmarks, frame_rgb.shape)
+        return landmarks
 
-            largest_face = max(results.multi_face_landmarks, key=lambda x:
-                                (max([p.x for p in x.landmark]) - min([p.x for p in x.landmark])) *
-                                (max([p.y for p in x.landmark]) - min([p.y for p in x.landmark])))
-            landmarks = [(p.x * frame.shape[1], p.y * frame.shape[0]) for p in largest_face.landmark]
+    def detect_eye_state(self, frame_rgb, current_time=None):
+        """Detect eye state with occlusion handling and smoothed EAR"""
+        current_time = current_time if current_time is not None else time.time()
+        landmarks = self.locate_face(frame_rgb, current_time)
 
-            left_eye = [landmarks[i] for i in [33, 160, 158, 133, 153, 144]]
-            right_eye = [landmarks[i] for i in [362, 385, 387, 263, 373, 380]]
+        self.last_ears = None
+        if landmarks is not None:
+            self.face_absent_timer = current_time
 
-            left_ear = self.calculate_ear(left_eye)
-            right_ear = self.calculate_ear(right_eye)
-            avg_ear = (left_ear + right_ear) / 2.0
+            # Both EARs in one vectorised pass; process() reuses them for the status text
+            self.last_ears = lm.eye_aspect_ratios(landmarks)
+            avg_ear = float(self.last_ears.mean())
 
             self.ear_history.append(avg_ear)
             if len(self.ear_history) > self.ear_smoothing_window:
@@ -104,30 +163,24 @@ class EyeDetector(BaseDetector):
                 return "Occluded", None
             return None, None
 
-    def process(self, frame):
-        """Process frame and return eye state, modified frame, and status text"""
+    def process(self, ctx):
+        """Process frame and return eye state, modified frame, and status text
+
+        Landmarks are in detection-image coordinates. Nothing is drawn here: the
+        overlay is described by ``overlay()`` and rendered only for viewers.
+        """
+        frame = ctx.view
         if not self.is_active:
             return None, frame, "Eye detection inactive"
 
         # Enhance lighting if needed
-        enhanced_frame = self.check_lighting(frame)
-        eye_state, landmarks = self.detect_eye_state(enhanced_frame)
+        detection_rgb = self.check_lighting(ctx)
+        eye_state, landmarks = self.detect_eye_state(detection_rgb, ctx.timestamp)
+        self.last_landmarks = landmarks
 
         status_text = ""
-        # Overlay information on the frame
-        if landmarks:
-            # Define indices for eyes and mouth
-            left_eye_indices = [33, 160, 158, 133, 153, 144]
-            right_eye_indices = [362, 385, 387, 263, 373, 380]
-            mouth_indices = [61, 291, 0, 17]  # Outer lip landmarks
-
-            # Draw only eye and mouth landmarks
-            for idx in left_eye_indices + right_eye_indices + mouth_indices:
-                point = landmarks[idx]
-                cv2.circle(enhanced_frame, (int(point[0]), int(point[1])), 2, (0, 255, 0), -1)
-
-            left_eye = [landmarks[i] for i in left_eye_indices]
-            ear_val = self.calculate_ear(left_eye)
+        if landmarks is not None:
+            ear_val = self.last_ears[0]
             status_text = f"EAR: {ear_val:.2f}"
             if self.open_eye_threshold is not None and self.closed_eye_threshold is not None:
                 status_text += f" (Open>{(self.open_eye_threshold + self.closed_eye_threshold) / 2:.2f})"
@@ -141,10 +194,14 @@ class EyeDetector(BaseDetector):
         else:
             status_text = "No face detected" if eye_state != "Occluded" else "Possible occlusion"
 
-        cv2.putText(enhanced_frame, status_text, (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        self.last_status_text = status_text
 
         # Return eye state, processed frame, and status text
-        return (eye_state, enhanced_frame, status_text)
+        return (eye_state, frame, status_text)
+
+    def overlay(self):
+        """Overlay primitives of the latest run (landmarks and eye status)"""
+        return lm.eye_overlay(self.last_landmarks, self.last_status_text)
 
     def reset(self):
         """Reset calibration and timers"""
@@ -153,4 +210,8 @@ class EyeDetector(BaseDetector):
         self.closed_eye_threshold = None
         self.face_absent_timer = 0
         self.brightness_history.clear()
-        self.ear_history.clear()
\ No newline at end of file
+        self.ear_history.clear()
+        self.last_landmarks = None
+        self.last_ears = None
+        self.track_roi = None
+        self.last_full_search = 0.0
\ No newline at end of file
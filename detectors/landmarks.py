@@ -0,0 +1,55 @@
+import numpy as np
+
+from pipeline.overlay import Points, Text
+
+# FaceMesh indices: EAR order is (outer corner, top, top, inner corner, bottom, bottom)
+LEFT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE_INDICES = [362, 385, 387, 263, 373, 380]
+MOUTH_INDICES = [61, 291, 0, 17]  # Outer lip landmarks
+EYE_INDICES = np.array([LEFT_EYE_INDICES, RIGHT_EYE_INDICES])
+OVERLAY_INDICES = np.array(LEFT_EYE_INDICES + RIGHT_EYE_INDICES + MOUTH_INDICES)
+
+
+def landmarks_to_array(faces, width, height, x0=0.0, y0=0.0):
+    """Convert FaceMesh results to a float32 ``(n_faces, n_points, 2)`` pixel array.
+
+    Normalised coordinates are scaled by ``width``/``height`` and offset by ``x0``/``y0``,
+    which maps landmarks found in a crop back into the full frame. This is the only
+    per-point Python loop; everything downstream is vectorised.
+    """
+    points = np.empty((len(faces), len(faces[0].landmark), 2), dtype=np.float32)
+    for i, face in enumerate(faces):
+        # Two flat comprehensions are ~3x faster than building (x, y) tuples
+        points[i, :, 0] = [p.x for p in face.landmark]
+        points[i, :, 1] = [p.y for p in face.landmark]
+    points *= np.array([width, height], dtype=np.float32)
+    if x0 or y0:
+        points += np.array([x0, y0], dtype=np.float32)
+    return points
+
+
+def bounding_boxes(points):
+    """``(n, 4)`` array of ``x0, y0, x1, y1`` for ``(n, n_points, 2)`` landmarks."""
+    return np.concatenate((points.min(axis=1), points.max(axis=1)), axis=1)
+
+
+def largest_face_index(points) -> int:
+    """Index of the face with the largest landmark bounding-box area."""
+    boxes = bounding_boxes(points)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return int(np.argmax(areas))
+
+
+def eye_aspect_ratios(landmarks):
+    """Left and right Eye Aspect Ratio of one ``(n_points, 2)`` face, as a ``(2,)`` array."""
+    eyes = landmarks[EYE_INDICES]  # (2 eyes, 6 points, 2)
+    v1 = np.linalg.norm(eyes[:, 1] - eyes[:, 5], axis=1)
+    v2 = np.linalg.norm(eyes[:, 2] - eyes[:, 4], axis=1)
+    h = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1)
+    return (v1 + v2) / (2.0 * h)
+
+
+def eye_overlay(landmarks, status_text):
+    """Overlay primitives for the eye/mouth landmarks (detection coordinates) and the eye status."""
+    items = () if landmarks is None else (Points(landmarks[OVERLAY_INDICES]),)
+    return items + (Text(status_text or "", 10, 150),)
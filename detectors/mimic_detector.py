@@ -4,7 +4,7 @@ class MimicDetector(BaseDetector):
     def __init__(self):
         super().__init__()
         
-    def process(self, frame):
+    def process(self, ctx):
         if not self.is_active:
             return None
         # Add mimic detection logic here
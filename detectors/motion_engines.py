@@ -0,0 +1,65 @@
+import cv2
+
+
+class GaussianMotionEngine:
+    """Reference engine: 11x11 Gaussian blur and frame difference at full ROI resolution."""
+
+    name = "gaussian"
+
+    def __init__(self, threshold=15):
+        self.threshold = threshold
+        self.previous_frame = None
+
+    def prepare(self, gray):
+        return cv2.GaussianBlur(gray, (11, 11), 0)
+
+    def measure(self, gray):
+        """Return the percentage of ROI pixels that changed since the previous call."""
+        current = self.prepare(gray)
+        previous, self.previous_frame = self.previous_frame, current
+        if previous is None or previous.shape != current.shape:
+            return 0.0
+
+        frame_diff = cv2.absdiff(previous, current)
+        thresh = cv2.threshold(frame_diff, self.threshold, 255, cv2.THRESH_BINARY)[1]
+        # countNonZero counts in place instead of allocating a boolean mask
+        return cv2.countNonZero(thresh) / thresh.size * 100
+
+    def reset(self):
+        self.previous_frame = None
+
+
+class DecimatedMotionEngine(GaussianMotionEngine):
+    """Cheaper engine: area-downscale the ROI by ``decimation``, then a small box blur.
+
+    Area interpolation already averages each ``decimation x decimation`` block, so the
+    box blur only needs to cover what remains of the reference 11-pixel Gaussian; by
+    default its kernel is ``11 / decimation`` rounded to an odd size (1 disables it).
+    Higher decimation is cheaper but the motion percentage drifts further from the
+    reference engine; ``benchmarks/bench_motion.py`` reports both for a given camera.
+    """
+
+    name = "decimated"
+
+    def __init__(self, threshold=15, decimation=4, blur_ksize=None):
+        super().__init__(threshold)
+        self.decimation = max(1, int(decimation))
+        if blur_ksize is None:
+            blur_ksize = max(1, int(11 / self.decimation)) | 1
+        self.blur_ksize = blur_ksize
+
+    def prepare(self, gray):
+        height, width = gray.shape[:2]
+        size = (max(1, width // self.decimation), max(1, height // self.decimation))
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        if self.blur_ksize > 1:
+            small = cv2.blur(small, (self.blur_ksize, self.blur_ksize))
+        return small
+
+
+def create_motion_engine(name="gaussian", threshold=15, decimation=4):
+    if name == DecimatedMotionEngine.name:
+        return DecimatedMotionEngine(threshold, decimation)
+    if name == GaussianMotionEngine.name:
+        return GaussianMotionEngine(threshold)
+    raise ValueError(f"Unknown motion engine: {name}")
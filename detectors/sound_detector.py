@@ -1,15 +1,18 @@
-import pyaudio
 import numpy as np
 from .base_detector import BaseDetector
+from audio.audio_capture import MicrophoneCapture
+from audio.spectral import SpectralEngine
+from utils.logger import ThrottledLog
+from utils.rolling_window import RollingWindow
 import time
 import logging
 
 class SoundDetector(BaseDetector):
-    def __init__(self):
+    def __init__(self, source=None):
         super().__init__()
         self.logger = logging.getLogger("BabyMonitor")
+        self._log = ThrottledLog(self.logger, interval=10.0)
         self.chunk_size = 1024
-        self.format = pyaudio.paInt16
         self.channels = 1
         self.rate = 44100
         self.sound_threshold = 500   # General loudness
@@ -17,106 +20,103 @@ class SoundDetector(BaseDetector):
         self.cry_freq_min = 250      # Hz, lower bound for cry frequency
         self.cry_freq_max = 1000     # Hz, upper bound for cry frequency
         self.cry_duration = 1.0      # Seconds of cry-like sound
+        self.cry_gap = 0.5           # Seconds without cry-like chunks (breaths) a cry survives
         self.window_duration = 5.0
-        self.sound_history = []
+        self.sound_history = RollingWindow(self.window_duration)
         self.cry_start_time = None
-        self.audio = None
-        self.stream = None
-        self.is_active = False  # Default to inactive until proven otherwise
+        self.last_cry_time = None
+        self.last_amplitude = 0.0
+        self.last_freq = 0.0
+        self.last_centroid = 0.0
+        self.last_cry_ratio = 0.0
+        self.lost_samples = 0
 
-        try:
-            self.logger.info("Initializing SoundDetector...")
-            self.audio = pyaudio.PyAudio()
-            device_count = self.audio.get_device_count()
-            input_device_found = False
-            for i in range(device_count):
-                device_info = self.audio.get_device_info_by_index(i)
-                if device_info['maxInputChannels'] > 0:
-                    try:
-                        self.stream = self.audio.open(
-                            format=self.format,
-                            channels=self.channels,
-                            rate=self.rate,
-                            input=True,
-                            frames_per_buffer=self.chunk_size,
-                            input_device_index=i
-                        )
-                        input_device_found = True
-                        self.is_active = True
-                        self.logger.info(f"SoundDetector: Using input device: {device_info['name']}")
-                        break
-                    except Exception as e:
-                        self.logger.warning(f"SoundDetector: Failed to open device {device_info['name']}: {str(e)}")
-                        continue
-
-            if not input_device_found:
-                self.logger.warning("SoundDetector: No valid audio input device found. Sound detection disabled.")
-        except Exception as e:
-            self.logger.error(f"SoundDetector: Error initializing PyAudio: {str(e)}. Sound detection disabled.")
-            self.is_active = False
-        finally:
-            if not self.is_active and self.audio:
-                self.audio.terminate()
-                self.audio = None
+        self.logger.info("Initializing SoundDetector...")
+        # Audio arrives on PortAudio's callback thread (or from a replay); process() only drains the ring
+        self.capture = source or MicrophoneCapture(rate=self.rate, channels=self.channels,
+                                                   chunk_size=self.chunk_size)
+        self.is_active = self.capture.is_active
+        self.spectral = SpectralEngine(self.rate, self.chunk_size,
+                                       cry_band=(self.cry_freq_min, self.cry_freq_max))
+        self._read_pos = self.capture.ring.write_pos
 
     def detect_sound(self):
-        """Detect sound amplitude and frequency"""
-        if not self.is_active or not self.stream:
-            return 0.0, 0.0
-        
+        """Analyse every chunk captured since the last call without blocking.
+
+        Returns the SpectralFeatures of the new chunks (oldest first), or None
+        when no complete chunk has arrived yet.
+        """
+        if not self.is_active:
+            return None
+
         try:
-            data = self.stream.read(self.chunk_size, exception_on_overflow=False)
-            audio_data = np.frombuffer(data, dtype=np.int16)
-            amplitude = np.sqrt(np.mean(audio_data**2))
-            fft_data = np.fft.fft(audio_data)
-            freqs = np.fft.fftfreq(len(fft_data)) * self.rate
-            fft_magnitude = np.abs(fft_data)
-            mask = (freqs >= self.cry_freq_min) & (freqs <= self.cry_freq_max)
-            dominant_freq = freqs[mask][np.argmax(fft_magnitude[mask])] if np.any(mask) else 0.0
-            return amplitude, dominant_freq
+            samples, self._read_pos, lost = self.capture.ring.read_since(self._read_pos, self.chunk_size)
+            if lost:
+                self.lost_samples += lost
+                self._log.every("overrun", f"SoundDetector: Audio ring overrun, {self.lost_samples} samples skipped so far")
+            if len(samples) == 0:
+                return None
+            return self.spectral.analyze(samples.reshape(-1, self.chunk_size))
         except Exception as e:
-            self.logger.error(f"SoundDetector: Error reading audio stream: {str(e)}")
-            return 0.0, 0.0
+            self._log.every("read", f"SoundDetector: Error reading audio ring: {str(e)}", logging.ERROR)
+            return None
 
-    def process(self):
-        """Process sound and detect crying with frequency"""
-        if not self.is_active or not self.stream:
+    def process(self, ctx=None):
+        """Process sound and detect crying with frequency; audio is independent of ``ctx``"""
+        if not self.is_active:
             return None, "Sound detection inactive or no audio device"
 
         try:
-            current_time = time.time()
-            amplitude, dominant_freq = self.detect_sound()
-            
-            self.sound_history.append((current_time, amplitude))
-            while self.sound_history and current_time - self.sound_history[0][0] > self.window_duration:
-                self.sound_history.pop(0)
-            
-            average_sound = sum(level for _, level in self.sound_history) / len(self.sound_history) if self.sound_history else 0.0
+            current_time = ctx.timestamp if ctx is not None else time.time()
+            features = self.detect_sound()
+            amplitudes = features.rms.tolist() if features is not None else []
+            freqs = features.dominant_freq.tolist() if features is not None else []
+            chunk_duration = self.chunk_size / self.rate
+
+            # Walk the chunks in capture order so cry duration uses all audio
+            for i, (chunk_amplitude, chunk_freq) in enumerate(zip(amplitudes, freqs)):
+                chunk_time = current_time - (len(amplitudes) - 1 - i) * chunk_duration
+                self.sound_history.add(chunk_time, chunk_amplitude)
+                is_cry_like = (chunk_amplitude > self.cry_amplitude) and \
+                              (self.cry_freq_min <= chunk_freq <= self.cry_freq_max)
+                if is_cry_like:
+                    if self.cry_start_time is None:
+                        self.cry_start_time = chunk_time
+                    self.last_cry_time = chunk_time
+                elif self.cry_start_time is not None and chunk_time - self.last_cry_time > self.cry_gap:
+                    self.cry_start_time = None
+
+            if amplitudes:
+                loudest = int(np.argmax(amplitudes))
+                self.last_amplitude = float(np.sqrt(np.mean(np.square(amplitudes))))
+                self.last_freq = freqs[loudest]
+                self.last_centroid = float(features.centroid[loudest])
+                self.last_cry_ratio = float(features.cry_ratio[loudest])
+            amplitude, dominant_freq = self.last_amplitude, self.last_freq
+
+            self.sound_history.expire(current_time)
+            average_sound = self.sound_history.mean
 
             is_loud = amplitude > self.sound_threshold
-            is_cry_like = (amplitude > self.cry_amplitude) and \
-                          (self.cry_freq_min <= dominant_freq <= self.cry_freq_max)
-            is_crying = False
-            
-            if is_cry_like:
-                if self.cry_start_time is None:
-                    self.cry_start_time = current_time
-                elif current_time - self.cry_start_time >= self.cry_duration:
-                    is_crying = True
-            else:
+            # Cries are broken by breaths: a gap up to cry_gap does not end one
+            if self.cry_start_time is not None and current_time - self.last_cry_time > self.cry_gap:
                 self.cry_start_time = None
+            is_crying = self.cry_start_time is not None and \
+                self.last_cry_time - self.cry_start_time >= self.cry_duration
 
             sound_data = {
                 'current_amplitude': amplitude,
                 'average_sound': average_sound,
                 'dominant_freq': dominant_freq,
+                'spectral_centroid': self.last_centroid,
+                'cry_ratio': self.last_cry_ratio,
                 'is_loud': is_loud,
                 'is_crying': is_crying
             }
             status_text = f"Sound: {amplitude:.0f}, Avg: {average_sound:.0f}, Freq: {dominant_freq:.0f}, Crying: {is_crying}"
             return sound_data, status_text
         except Exception as e:
-            self.logger.error(f"SoundDetector: Error processing sound: {str(e)}")
+            self._log.every("process", f"SoundDetector: Error processing sound: {str(e)}", logging.ERROR)
             return None, "Sound detection error"
 
     def reset(self):
@@ -124,17 +124,15 @@ class SoundDetector(BaseDetector):
         try:
             self.sound_history.clear()
             self.cry_start_time = None
+            self.last_cry_time = None
         except Exception as e:
             self.logger.error(f"SoundDetector: Error resetting: {str(e)}")
 
     def cleanup(self):
         """Close audio stream"""
         try:
-            if self.stream:
-                self.stream.stop_stream()
-                self.stream.close()
-            if self.audio:
-                self.audio.terminate()
+            self.capture.close()
+            self.is_active = False
             self.logger.info("SoundDetector: Cleanup completed")
         except Exception as e:
-            self.logger.error(f"SoundDetector: Error during cleanup: {str(e)}")
\ No newline at end of file
+            self.logger.error(f"SoundDetector: Error during cleanup: {str(e)}")
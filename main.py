@@ -1,22 +1,40 @@
-import cv2
 import os
-import queue
 import signal
 import subprocess
 import sys
 import time
 from threading import Thread
-from typing import Optional, Tuple, Dict, Any
 
-from flask import Flask, Response, request, render_template_string, send_file
+from flask import Flask, Response, request
 from flask_httpauth import HTTPBasicAuth
 
+from audio.replay_audio import ReplayAudioSource
 from camera.camera_manager import CameraManager
+from camera.frame_ring import FrameRing
+from camera.replay_camera import ReplayCameraManager
 from detectors.eyes_detector import EyeDetector
 from detectors.motion_detector import MotionDetector
 from detectors.sound_detector import SoundDetector
+from pipeline.detection_worker import DetectionWorker
+from pipeline.detector_scheduler import DetectorScheduler
+from pipeline.process_executor import RemoteDetector
+from pipeline.stats_rollup import StatsRollup, etag_matches
+from streaming import templates
+from streaming.asgi_server import MonitorASGIApp, serve as serve_asgi
+from storage.clip_recorder import ClipRecorder
+from storage.state_store import StateStore
+from streaming.broadcast_hub import BroadcastHub
+from streaming.snapshot_cache import SnapshotCache
+from streaming.state_events import StateEventBroadcaster, HEARTBEAT, RETRY
 from utils.config import Config  
-from utils.logger import Logger
+from utils.logger import Logger, ThrottledLog
+from utils.metrics import REGISTRY, CONTENT_TYPE, STAGE_SECONDS, RateMeter
+from utils.recording import SessionRecorder
+
+CAPTURE_SECONDS = STAGE_SECONDS.labels(stage="capture")
+SEND_SECONDS = STAGE_SECONDS.labels(stage="send")
+FRAMES_CAPTURED = REGISTRY.counter("beshique_frames_captured_total", "Frames written to the frame ring")
+CAMERA_ERRORS = REGISTRY.counter("beshique_camera_errors_total", "Failed camera captures")
 
 app = Flask(__name__)
 auth = HTTPBasicAuth()
@@ -30,197 +48,234 @@ def verify_password(username, password):
 class BabyMonitor:
     def __init__(self):
         self.logger = Logger()
+        self._log = ThrottledLog(self.logger.logger, interval=10.0)
         self.logger.info("=== Initialising BabyMonitor ===")
 
         self.config = Config()  
         self.fps: float = getattr(self.config, "fps", 10)
         self.jpeg_quality: int = getattr(self.config, "jpeg_quality", 50)
 
-        self.camera = CameraManager(resolution=self.config.resolution)
-        self.eyes_detector = EyeDetector()
-        self.motion_detector = MotionDetector()
-        self.sound_detector = SoundDetector()
+        # Preallocated frame slots shared by capture, detection and snapshots; in process
+        # mode they live in shared memory so detector workers read frames in place
+        width, height = self.config.detection_resolution
+        main_width, main_height = self.config.resolution
+        self.ring = FrameRing((height * 3 // 2, width), (main_height, main_width, 3),
+                              slots=self.config.frame_ring_slots,
+                              shared=self.config.execution_mode == "process")
+
+        # Detector processes are forked first, before the camera and any thread exist
+        self.eyes_detector = self._build_detector("eyes", EyeDetector, {
+            "tracking": self.config.face_tracking,
+            "reacquire_interval": self.config.face_reacquire_interval})
+        self.motion_detector = self._build_detector("motion", MotionDetector, {
+            "engine": self.config.motion_engine,
+            "decimation": self.config.motion_decimation})
+        self.audio_source = ReplayAudioSource() if self.config.replay_path else None
+        self.sound_detector = self._build_detector(
+            "sound", SoundDetector, {"source": self.audio_source} if self.audio_source else {})
+        if self.config.replay_path:
+            self.camera = ReplayCameraManager(self.config.replay_path, resolution=self.config.resolution,
+                                              lores_resolution=self.config.detection_resolution,
+                                              speed=self.config.replay_speed, loop=self.config.replay_loop,
+                                              audio_source=self.audio_source)
+        else:
+            self.camera = CameraManager(resolution=self.config.resolution,
+                                        lores_resolution=self.config.detection_resolution)
+
+        self.recorder = None
+        if self.config.record_path:
+            capture = getattr(self.sound_detector, "capture", None)
+            self.recorder = SessionRecorder(self.config.record_path, self.ring,
+                                            audio_ring=capture.ring if capture is not None else None,
+                                            record_main=self.config.record_main)
+            self.recorder.start()
+
+        # Single shared detection pipeline; viewers only subscribe to its results
+        self.scheduler = DetectorScheduler(
+            base_interval=self.config.detection_interval,
+            calm_intervals=self.config.calm_detector_intervals,
+            stable_after=self.config.scheduler_stable_after,
+            burst_duration=self.config.scheduler_burst_duration)
+        self.detection = DetectionWorker(self.ring, self.eyes_detector,
+                                         self.motion_detector, self.sound_detector,
+                                         scheduler=self.scheduler)
+        self.detection.start()
+
+        # Persistent state history; statistics are read from its hourly rollups
+        self.state_store = StateStore(None if self.config.replay_path else self.config.state_db_path,
+                                      self.detection.results,
+                                      sample_interval=self.config.state_sample_interval,
+                                      retention_days=self.config.state_retention_days,
+                                      night_hours=self.config.night_hours)
+        # Minute/hour/night rollups behind /api/stats and the statistics page; loads the
+        # stored history before the store writes anything from this run
+        self.stats = StatsRollup(self.detection.results, self.state_store,
+                                 night_hours=self.config.night_hours)
+        self.state_store.start()
+        self.stats.start()
+
+        self.clips = None
+        if self.config.clip_dir:
+            capture = getattr(self.sound_detector, "capture", None)
+            self.clips = ClipRecorder(self.config.clip_dir, self.ring, self.detection.results,
+                                      audio_ring=capture.ring if capture is not None else None,
+                                      trigger_states=self.config.clip_trigger_states,
+                                      pre_roll=self.config.clip_pre_roll, post_roll=self.config.clip_post_roll,
+                                      fps=self.config.clip_fps, max_clips=self.config.clip_max_count,
+                                      max_bytes=self.config.clip_max_bytes)
+            self.clips.start()
+
+        # Encode-once JPEG fan-out to every /video_feed client
+        self.hub = BroadcastHub(self.detection.results, size=(640, 480),
+                                jpeg_quality=self.jpeg_quality, fps=self.fps,
+                                max_subscribers=self.config.max_viewers,
+                                max_fps=self.config.stream_max_fps)
+        self.hub.start()
+
+        # /snapshot.jpg: newest frame, encoded at most once per frame (raw or annotated)
+        self.snapshots = SnapshotCache(self.ring, self.detection.results, renderer=self.hub.renderer)
+
+        # Push channel for apps: state changes only, no video
+        self.events = StateEventBroadcaster(self.detection.results, heartbeat=self.config.event_heartbeat,
+                                            max_listeners=self.config.max_event_listeners)
+        self.events.start()
+
+        self.capture_rate = RateMeter()
+        self._register_metrics()
 
-        self.frame_q: "queue.Queue[Optional[Any]]" = queue.Queue(maxsize=1)
         self._running = True
-        Thread(target=self._capture_loop, daemon=True).start()
-
-        self.current_state = "Unknown"
-        self.previous_state: Optional[str] = None
-        self.state_start_time: float = time.time()
-        self.last_state_update: float = time.time()
-        self.state_times: Dict[str, float] = {"Sleeping": 0.0, "Active": 0.0, "Crying": 0.0}
-        self.bouncing_level: int = 0
-        self.eye_state_history: list[Optional[bool]] = []
+        self._capture_thread = Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
 
         self.logger.info("BabyMonitor ready (FPS=%s, JPEG=%s)" % (self.fps, self.jpeg_quality))
 
+    def _build_detector(self, kind, cls, kwargs):
+        """Local detector, or a process-backed proxy when ``execution_mode`` is "process"."""
+        if self.config.execution_mode == "process" and kind in self.config.process_detectors:
+            if kind == "sound":
+                # The microphone ring must live here, where the recorders read it
+                self.logger.warning("Sound detection always runs in-process; ignoring it in process_detectors")
+                return cls(**kwargs)
+            width, height = self.config.detection_resolution
+            return RemoteDetector(kind, (height * 3 // 2, width), ring=self.ring, **kwargs)
+        return cls(**kwargs)
+
     def _capture_loop(self):
-        """Continuously grab frames; replace queue item if full (drop old)."""
+        """Continuously capture into the frame ring; readers never consume frames."""
         while self._running:
-            frame = self.camera.get_frame()
-            if frame is None:
-                self.logger.warning("Camera returned None frame")
-                continue
             try:
-                self.frame_q.put_nowait(frame)
-            except queue.Full:
-                _ = self.frame_q.get_nowait()
-                self.frame_q.put_nowait(frame)
-
-    def _classify_state(self, eye_state, motion_state, sound_state) -> str:
-        """Return high‑level baby state (Sleeping / Active / Crying …)."""
-        try:
-            if eye_state is None or motion_state is None or sound_state is None:
-                return "Unknown"
-
-            eyes_closed = not eye_state[0] if eye_state[0] not in [None, "Occluded"] else None
-            motion_score = motion_state[0]["motion_score"] if motion_state[0] else 0
-            subtle_motion = motion_state[0]["subtle_motion"] if motion_state[0] else 0
-            is_loud = sound_state[0]["is_loud"] if sound_state[0] else False
-            is_crying = sound_state[0]["is_crying"] if sound_state[0] else False
-
-            if eyes_closed is not None:
-                if is_crying:
-                    return "Crying"
-                if motion_score > 25 or (subtle_motion > 0 and motion_score > 10) or is_loud:
-                    return "Active"
-                if eyes_closed and motion_score < 5 and not is_loud:
-                    return "Sleeping"
-                if not eyes_closed and motion_score < 25:
-                    return "Awake/Calm"
-            elif eye_state[0] == "Occluded":
-                return "Occluded"
-            return "Unknown"
-        except Exception as exc:
-            self.logger.error(f"State classification error: {exc}")
-            return "Unknown"
-
-    def _update_bouncing_level(self, current_state, motion_data, sound_data, eyes_open):
-        """Update bouncing level and state times."""
-        try:
-            current_time = time.time()
-            motion_score = motion_data['motion_score'] if motion_data else 0
-            average_motion = motion_data['average_motion'] if motion_data else 0
-            subtle_motion = motion_data['subtle_motion'] if motion_data else 0
-            motion_trend = motion_data['motion_trend'] if motion_data else 0
-            sound_amplitude = sound_data['current_amplitude'] if sound_data else 0
-            average_sound = sound_data['average_sound'] if sound_data else 0
-            is_loud = sound_data['is_loud'] if sound_data else False
-            is_crying = sound_data['is_crying'] if sound_data else False
-            
-            if eyes_open is not None:
-                self.eye_state_history.append(eyes_open)
-                if len(self.eye_state_history) > 5:  
-                    self.eye_state_history.pop(0)
-            
-            # Update state times
-            if self.current_state not in ["Unknown", "Occluded"]:
-                duration = current_time - self.last_state_update
-                if is_crying:
-                    self.state_times["Crying"] += duration
-                elif self.current_state == "Sleeping" and all(not state for state in self.eye_state_history[-5:] if state is not None):
-                    self.state_times["Sleeping"] += duration
-                elif self.current_state in ["Active", "Awake/Calm"]:
-                    self.state_times["Active"] += duration
-            self.last_state_update = current_time
-
-            # Update state transition tracking
-            if current_state != self.previous_state:
-                self.state_start_time = current_time
-                self.previous_state = current_state
-            
-            state_duration = current_time - self.state_start_time
-            
-            # Update bouncing level
-            if state_duration >= 0.5:
-                if eyes_open == "Occluded":
-                    self.logger.info(f"Bouncing level unchanged due to occlusion: {self.bouncing_level}")
-                    return self.bouncing_level
-                
-                if is_crying:
-                    self.bouncing_level = 3
-                elif (current_state == "Active" and average_motion > 0.8) or \
-                     (motion_trend > 0.5 and subtle_motion > 0) or \
-                     (is_loud and average_sound > 800):
-                    self.bouncing_level = 2
-                elif eyes_open or (average_motion > 0.5 and motion_score > 10) or \
-                     (average_sound > 500 and not is_crying):
-                    self.bouncing_level = 1
-                elif current_state == "Sleeping" or (motion_score < 5 and not is_loud):
-                    self.bouncing_level = 0
-            
-            self.logger.info(f"Bouncing level updated: {self.bouncing_level}")
-            return self.bouncing_level
-        except Exception as e:
-            self.logger.error(f"Error in _update_bouncing_level: {str(e)}")
-            return self.bouncing_level
+                start = time.perf_counter()
+                # The full-size BGR frame is only needed while someone is watching
+                # or a raw snapshot asked for it
+                seq = self.camera.capture_into(self.ring, with_main=self._wants_main())
+                CAPTURE_SECONDS.observe(time.perf_counter() - start)
+            except EOFError:
+                self.logger.info("Replay finished, capture stopped")
+                break
+            except Exception as exc:
+                CAMERA_ERRORS.inc()
+                self._log.every("camera", f"Camera capture failed: {exc}")
+                time.sleep(0.1)
+                continue
+            FRAMES_CAPTURED.inc()
+            self.capture_rate.mark()
+            if getattr(self.camera, "lockstep", False):
+                # As-fast-as-possible replay: let detection finish this frame so none is skipped
+                self.detection.results.wait_frame(seq, timeout=5.0)
+
+    def _register_metrics(self):
+        """Gauges read at scrape time; the counters and stage timers update as they happen."""
+        REGISTRY.gauge("beshique_viewers", "Connected /video_feed clients").set_function(
+            lambda: self.hub.subscriber_count)
+        fps = REGISTRY.gauge("beshique_effective_fps", "Measured frames per second", ("source",))
+        fps.labels(source="capture").set_function(self.capture_rate.rate)
+        fps.labels(source="detection").set_function(lambda: self.detection.throughput()["ticks_per_second"])
+        fps.labels(source="stream").set_function(self.hub.output_rate.rate)
+        state = REGISTRY.gauge("beshique_bouncing_level", "Current bouncing level")
+        state.set_function(lambda: self.detection.bouncing_level)
+        REGISTRY.gauge("beshique_stream_profiles", "Distinct stream profiles being encoded").set_function(
+            lambda: self.hub.profile_count)
+        REGISTRY.gauge("beshique_event_listeners", "Connected /events clients").set_function(
+            lambda: self.events.listener_count)
+
+    def _wants_main(self) -> bool:
+        hub = getattr(self, "hub", None)
+        snapshots = getattr(self, "snapshots", None)
+        if hub is not None and hub.subscriber_count > 0:
+            return True
+        return snapshots is not None and snapshots.wants_main
 
-    def generate_frames(self):
-        """Yield MJPEG stream; will drop frames if client is too slow."""
-        frame_interval = 1 / self.fps
-        while True:
-            try:
-                start_time = time.time()
+    @property
+    def current_state(self) -> str:
+        return self.detection.current_state
 
-                # Pop the latest frame; if none available within 0.2 s keep looping
-                try:
-                    frame = self.frame_q.get(timeout=0.2)
-                except queue.Empty:
-                    continue
+    @property
+    def bouncing_level(self) -> int:
+        return self.detection.bouncing_level
 
-                # Process detectors -----------------------------------
-                eye_result = self.eyes_detector.process(frame)
-                eyes_open = eye_result[0] if eye_result else None
-                processed_frame = eye_result[1] if eye_result else frame
-                landmarks = eye_result[1] if eye_result and eyes_open in [True, False] else None
-
-                motion_state = self.motion_detector.process(processed_frame, face_landmarks=landmarks)
-                sound_state = self.sound_detector.process()
-
-                self.current_state = self._classify_state(eye_result, motion_state, sound_state)
-
-                # Update bouncing level and state times
-                motion_data = motion_state[0] if motion_state and motion_state[0] else None
-                sound_data = sound_state[0] if sound_state and sound_state[0] else None
-                self.bouncing_level = self._update_bouncing_level(self.current_state, motion_data, sound_data, eyes_open)
-                # Overlay --------------------------------------------
-                cv2.putText(processed_frame, f"State: {self.current_state}", (10, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-                cv2.putText(processed_frame, f"Bouncing level: {self.bouncing_level}", (10, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-                # Resize + encode ------------------------------------
-                stream_frame = cv2.resize(processed_frame, (640, 480))
-                ret, jpeg = cv2.imencode('.jpg', stream_frame,
-                                         [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
-                if not ret:
-                    self.logger.error("JPEG encode failed")
+    def generate_frames(self, sub):
+        """Yield MJPEG stream for a hub subscription; a slow client only loses its own frames."""
+        try:
+            while not sub.closed:
+                jpeg = sub.get(timeout=0.5)
+                if jpeg is None:
                     continue
-
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
-
-                # Frame pacing ---------------------------------------
-                elapsed = time.time() - start_time
-                if elapsed < frame_interval:
-                    time.sleep(frame_interval - elapsed)
-            except GeneratorExit:
-                # Client disconnected
-                break
-            except Exception as exc:
-                self.logger.error(f"MJPEG loop error: {exc}")
-                time.sleep(1)
+                start = time.perf_counter()
+                # The server writes the chunk before asking for the next one
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+                SEND_SECONDS.observe(time.perf_counter() - start)
+        finally:
+            # Client disconnected
+            self.hub.unsubscribe(sub)
+
+    def generate_events(self, listener):
+        """Yield the Server-Sent Events stream of one listener; heartbeats keep it alive when idle."""
+        try:
+            yield RETRY
+            while not listener.closed:
+                event = listener.get(timeout=self.events.heartbeat)
+                yield event if event is not None else HEARTBEAT
+        finally:
+            self.events.unsubscribe(listener)
 
     def get_statistics(self):
-        return {k: round(v, 1) for k, v in self.state_times.items()}
+        """Seconds asleep, active and crying over the last 24 hours (whole hours)."""
+        return self.stats.current()[2]["last_24h"]["groups"]
+
+    def statistics_context(self):
+        """Template context of the statistics page, shared by both servers."""
+        return {
+            "stats": self.get_statistics(),
+            "nights": self.stats.current()[2]["nights"],
+            "clients": self.hub.client_stats(),
+            "rates": self.scheduler.effective_rates(),
+            "mode": self.config.execution_mode,
+            "throughput": self.detection.throughput(),
+        }
 
     def cleanup(self):
         self._running = False
         try:
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.clips is not None:
+                self.clips.stop()
+            self.hub.stop()
+            self.events.stop()
+            self.detection.stop()
+            self.stats.stop()
+            self.state_store.stop()
+            self._capture_thread.join(timeout=2.0)
             self.camera.release()
             self.sound_detector.cleanup()
+            for detector in (self.eyes_detector, self.motion_detector):
+                if isinstance(detector, RemoteDetector):
+                    detector.cleanup()
+            self.ring.close()
             self.logger.info("Cleanup done, exiting.")
         except Exception as exc:
             self.logger.error(f"Cleanup error: {exc}")
+        self.logger.close()
 
 def check_ip():
     """Check and verify the IP address of wlan0"""
@@ -348,149 +403,159 @@ def _graceful_shutdown(signum, frame):
 for _sig in (signal.SIGINT, signal.SIGTERM):
     signal.signal(_sig, _graceful_shutdown)
 
+def configure_wifi(ssid, password):
+    """Connect to the submitted network, remember it and schedule the hotspot shutdown."""
+    try:
+        if try_connect_wifi(ssid, password):
+            wifi_config_path = '/home/admin/baby_crib/utils/wifi_config.txt'
+            os.makedirs(os.path.dirname(wifi_config_path), exist_ok=True)
+            with open(wifi_config_path, 'w') as f:
+                f.write(f"{ssid}\n{password}")
+            ip_result = subprocess.run(['hostname', '-I'], capture_output=True, text=True)
+            ip_address = ip_result.stdout.strip().split()[0] if ip_result.stdout.strip() else "unknown"
+            response = (f"Wi-Fi configured! Reconnect to your network and visit http://{ip_address}:5000. "
+                       "Hotspot stopping in 5 seconds...")
+            def stop_hotspot():
+                time.sleep(5)
+                try:
+                    subprocess.run(['sudo', 'systemctl', 'stop', 'hostapd'], check=False)
+                    subprocess.run(['sudo', 'systemctl', 'stop', 'dnsmasq'], check=False)
+                    subprocess.run(['sudo', 'nmcli', 'dev', 'disconnect', 'wlan0'], capture_output=True)
+                    monitor.logger.info("Hotspot stopped successfully")
+                except Exception as e:
+                    monitor.logger.error(f"Error stopping hotspot: {str(e)}")
+            Thread(target=stop_hotspot).start()
+            return response
+        else:
+            return "Error: Failed to connect to Wi-Fi. Please check credentials and try again."
+    except Exception as e:
+        monitor.logger.error(f"Setup error: {str(e)}")
+        return f"Error: {str(e)}"
+
 @app.route('/')
 @auth.login_required
 def index():
-    return render_template_string(
-        """
-        <html><head><title>Beshique Monitor</title></head>
-        <body style='text-align:center;font-family:Arial'>
-            <h2>Beshique Baby Monitor</h2>
-            <img src="{{ url_for('video_feed') }}" width="640" height="480"/>
-            <p><a href="{{ url_for('statistics') }}">Statistics</a> |
-               <a href="{{ url_for('snapshot') }}">Snapshot</a> |
-               <a href="{{ url_for('setup') }}">Wi-Fi Setup</a></p>
-        </body></html>
-        """)
+    return templates.render(templates.INDEX_HTML)
 
 @app.route('/video_feed')
 @auth.login_required
 def video_feed():
-    return Response(monitor.generate_frames(),
+    # Optional ?w=&h=&fps=&q= profile, or ?auto=1 to adapt to the connection
+    try:
+        profile, auto = monitor.hub.parse_profile(request.args)
+    except ValueError:
+        return "Bad stream parameters", 400
+    sub = monitor.hub.subscribe(request.remote_addr, profile=profile, auto=auto)
+    if sub is None:
+        return "Too many viewers", 503
+    return Response(monitor.generate_frames(sub),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/events')
+@auth.login_required
+def events():
+    # One request thread per listener here; Config.server_mode "asgi" serves them from the event loop
+    listener = monitor.events.subscribe(request.remote_addr)
+    if listener is None:
+        return "Too many listeners", 503
+    return Response(monitor.generate_events(listener), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/snapshot.jpg')
 @auth.login_required
 def snapshot():
-    try:
-        frame = monitor.frame_q.get(timeout=0.5)
-        _, jpeg = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-        return Response(jpeg.tobytes(), mimetype='image/jpeg')
-    except queue.Empty:
-        return "No frame", 503
+    # ?annotated=1 for the frame with the detection overlays
+    status, body, headers = monitor.snapshots.respond(
+        request.args.get("annotated", "") in ("1", "true", "yes"),
+        request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since"))
+    return Response(body, status=status, headers=headers,
+                    mimetype='image/jpeg' if status == 200 else 'text/plain')
 
 @app.route('/statistics')
 @auth.login_required
 def statistics():
-    stats = monitor.get_statistics()
-    tpl = """
-    <html><head><title>Stats</title></head>
-    <body style='text-align:center;font-family:Arial'>
-        <h2>State statistics (seconds)</h2>
-        {% for k, v in stats.items() %}<p>{{ k }}: {{ v }}</p>{% endfor %}
-        <p><a href="{{ url_for('index') }}">Back</a></p>
-    </body></html>"""
-    return render_template_string(tpl, stats=stats)
+    return templates.render(templates.STATISTICS_HTML, **monitor.statistics_context())
+
+@app.route('/api/stats')
+@auth.login_required
+def api_stats():
+    """Precomputed rollups as JSON; unchanged data since the client's ETag gets a 304."""
+    etag, body, _ = monitor.stats.current()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+@app.route('/metrics')
+@auth.login_required
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 @app.route('/setup', methods=['GET', 'POST'])
 @auth.login_required
 def setup():
     """Wi-Fi setup page"""
     if request.method == 'POST':
-        ssid = request.form['ssid']
-        password = request.form['password']
+        return configure_wifi(request.form['ssid'], request.form['password'])
+    return templates.render(templates.SETUP_HTML)
+
+# Single-event-loop alternative to Flask's thread-per-connection server (Config.server_mode)
+asgi_app = MonitorASGIApp(monitor, verify_password, configure_wifi)
+
+def run_server(host):
+    if monitor.config.server_mode == "asgi":
         try:
-            if try_connect_wifi(ssid, password):
-                wifi_config_path = '/home/admin/baby_crib/utils/wifi_config.txt'
-                os.makedirs(os.path.dirname(wifi_config_path), exist_ok=True)
-                with open(wifi_config_path, 'w') as f:
-                    f.write(f"{ssid}\n{password}")
-                ip_result = subprocess.run(['hostname', '-I'], capture_output=True, text=True)
-                ip_address = ip_result.stdout.strip().split()[0] if ip_result.stdout.strip() else "unknown"
-                response = (f"Wi-Fi configured! Reconnect to your network and visit http://{ip_address}:5000. "
-                           "Hotspot stopping in 5 seconds...")
-                def stop_hotspot():
-                    time.sleep(5)
-                    try:
-                        subprocess.run(['sudo', 'systemctl', 'stop', 'hostapd'], check=False)
-                        subprocess.run(['sudo', 'systemctl', 'stop', 'dnsmasq'], check=False)
-                        subprocess.run(['sudo', 'nmcli', 'dev', 'disconnect', 'wlan0'], capture_output=True)
-                        monitor.logger.info("Hotspot stopped successfully")
-                    except Exception as e:
-                        monitor.logger.error(f"Error stopping hotspot: {str(e)}")
-                Thread(target=stop_hotspot).start()
-                return response
-            else:
-                return "Error: Failed to connect to Wi-Fi. Please check credentials and try again."
-        except Exception as e:
-            monitor.logger.error(f"Setup error: {str(e)}")
-            return f"Error: {str(e)}"
-    return render_template_string("""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Wi-Fi Setup</title>
-        <style>
-            body { font-family: Arial, sans-serif; background-color: #f4f4f4; text-align: center; padding-top: 50px; }
-            form { display: inline-block; text-align: left; }
-            input { margin: 10px 0; padding: 5px; width: 200px; }
-            input[type="submit"] { background-color: #4CAF50; color: white; border: none; padding: 10px; cursor: pointer; }
-        </style>
-    </head>
-    <body>
-        <h1>Setup Wi-Fi</h1>
-        <form method="post">
-            <label>Wi-Fi Name (SSID):</label><br>
-            <input type="text" name="ssid" required><br>
-            <label>Password:</label><br>
-            <input type="password" name="password" required><br>
-            <input type="submit" value="Connect">
-        </form>
-    </body>
-    </html>
-    """)
-
-wifi_config_path = '/home/admin/baby_crib/utils/wifi_config.txt'
-os.makedirs(os.path.dirname(wifi_config_path), exist_ok=True)
-
-if is_wifi_connected():
-    monitor.logger.info("WiFi already connected, proceeding to Flask server.")
+            serve_asgi(asgi_app, host=host, port=5000)
+            return
+        except ImportError:
+            monitor.logger.error("server_mode is 'asgi' but uvicorn is not installed; falling back to Flask")
+    app.run(host=host, port=5000, threaded=True)
+
+if monitor.config.replay_path:
+    monitor.logger.info("Replaying a recording: Wi-Fi and hotspot management disabled.")
 else:
-    monitor.logger.info("No WiFi connection detected.")
-    subprocess.run(['sudo', 'ip', 'link', 'set', 'wlan0', 'up'], check=False)
-    if os.path.exists(wifi_config_path):
-        monitor.logger.info("Found WiFi config, attempting to connect...")
-        try:
-            with open(wifi_config_path, 'r') as f:
-                content = f.read().strip()
-                if '\n' in content:
-                    ssid, password = content.split('\n')
-                    if try_connect_wifi(ssid, password):
-                        monitor.logger.info("WiFi connected successfully.")
+    wifi_config_path = '/home/admin/baby_crib/utils/wifi_config.txt'
+    os.makedirs(os.path.dirname(wifi_config_path), exist_ok=True)
+
+    if is_wifi_connected():
+        monitor.logger.info("WiFi already connected, proceeding to Flask server.")
+    else:
+        monitor.logger.info("No WiFi connection detected.")
+        subprocess.run(['sudo', 'ip', 'link', 'set', 'wlan0', 'up'], check=False)
+        if os.path.exists(wifi_config_path):
+            monitor.logger.info("Found WiFi config, attempting to connect...")
+            try:
+                with open(wifi_config_path, 'r') as f:
+                    content = f.read().strip()
+                    if '\n' in content:
+                        ssid, password = content.split('\n')
+                        if try_connect_wifi(ssid, password):
+                            monitor.logger.info("WiFi connected successfully.")
+                        else:
+                            monitor.logger.info("WiFi connection failed, activating hotspot...")
+                            setup_hotspot()
                     else:
-                        monitor.logger.info("WiFi connection failed, activating hotspot...")
+                        monitor.logger.error("Invalid WiFi config format")
                         setup_hotspot()
-                else:
-                    monitor.logger.error("Invalid WiFi config format")
-                    setup_hotspot()
-        except Exception as e:
-            monitor.logger.error(f"Error reading/using WiFi config: {str(e)}")
+            except Exception as e:
+                monitor.logger.error(f"Error reading/using WiFi config: {str(e)}")
+                setup_hotspot()
+        else:
+            monitor.logger.info("No WiFi config found, activating hotspot...")
             setup_hotspot()
-    else:
-        monitor.logger.info("No WiFi config found, activating hotspot...")
-        setup_hotspot()
 
 if __name__ == "__main__":
     try:
-        Thread(target=monitor_wifi, daemon=True).start()
+        if not monitor.config.replay_path:
+            Thread(target=monitor_wifi, daemon=True).start()
         current_ip = check_ip()
-        monitor.logger.info(f"Starting Flask server with detected IP: {current_ip}")
+        monitor.logger.info(f"Starting {monitor.config.server_mode} server with detected IP: {current_ip}")
         if os.path.exists('/run/hostapd.pid') and current_ip == "192.168.4.1":
-            monitor.logger.info("Starting Flask server in hotspot mode")
-            app.run(host='192.168.4.1', port=5000, threaded=True)
+            monitor.logger.info("Starting server in hotspot mode")
+            run_server('192.168.4.1')
         else:
-            monitor.logger.info("Starting Flask server in normal mode")
-            app.run(host='0.0.0.0', port=5000, threaded=True)
+            monitor.logger.info("Starting server in normal mode")
+            run_server('0.0.0.0')
     except Exception as e:
         monitor.logger.error(f"Server failed: {e}")
     finally:
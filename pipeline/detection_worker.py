@@ -0,0 +1,325 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from threading import Thread
+from typing import Optional, Dict, Any
+
+from utils.logger import ThrottledLog
+from utils.metrics import REGISTRY, STAGE_SECONDS
+from utils.rolling_window import RollingWindow
+from .detector_scheduler import DetectorScheduler
+from .overlay import Overlay, Text
+
+FRAMES_PROCESSED = REGISTRY.counter("beshique_frames_processed_total", "Frames run through detection")
+FRAMES_SKIPPED = REGISTRY.counter("beshique_frames_skipped_total",
+                                  "Captured frames detection never saw because it fell behind")
+FRAMES_LAPPED = REGISTRY.counter("beshique_frames_lapped_total",
+                                 "Frames overwritten in the ring before detection could copy them")
+DETECTOR_SECONDS = {name: STAGE_SECONDS.labels(stage=name) for name in ("eyes", "motion", "sound")}
+CLASSIFY_SECONDS = STAGE_SECONDS.labels(stage="classify")
+# Failed ticks in a row before the loop starts pausing a second between attempts
+MAX_FAILURES = 5
+
+
+@dataclass(frozen=True)
+class DetectionResult:
+    """Immutable outcome of one detection tick, shared by every viewer."""
+    seq: int
+    timestamp: float  # capture time of the frame the result was computed from
+    state: str
+    bouncing_level: int
+    eyes_open: Any
+    eye_status: str
+    motion_data: Optional[Dict[str, Any]]
+    sound_data: Optional[Dict[str, Any]]
+    frame: Any  # raw BGR view frame, marked read-only; None when nobody was viewing
+    frame_seq: Optional[int] = None  # FrameRing seq of that frame
+    ear: Optional[float] = None  # mean eye aspect ratio of the last face found
+    overlay: Optional[Overlay] = None  # drawn onto a copy of ``frame`` by OverlayRenderer
+
+
+class ResultChannel:
+    """Latest-value channel: one publisher, any number of waiting readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest: Optional[DetectionResult] = None
+
+    def publish(self, result: DetectionResult):
+        with self._cond:
+            self._latest = result
+            self._cond.notify_all()
+
+    def latest(self) -> Optional[DetectionResult]:
+        return self._latest
+
+    def wait_next(self, after_seq: int, timeout: Optional[float] = None) -> Optional[DetectionResult]:
+        """Block until a result newer than ``after_seq`` exists; None on timeout."""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._latest is not None and self._latest.seq > after_seq, timeout)
+            return self._latest if ready else None
+
+    def wait_frame(self, frame_seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until a result computed from frame ``frame_seq`` or later was published."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._latest is not None and (self._latest.frame_seq or 0) >= frame_seq, timeout)
+
+
+class DetectionWorker:
+    """Runs all detectors once per camera frame and publishes the fused result."""
+
+    def __init__(self, ring, eyes_detector, motion_detector, sound_detector, scheduler=None):
+        self.logger = logging.getLogger("BabyMonitor")
+        # Per-frame messages: values logged on change, errors at most every 10 s
+        self._log = ThrottledLog(self.logger, interval=10.0)
+        self.ring = ring
+        self.eyes_detector = eyes_detector
+        self.motion_detector = motion_detector
+        self.sound_detector = sound_detector
+        self.scheduler = scheduler or DetectorScheduler()
+        self.results = ResultChannel()
+        # Latest output of each detector, reused on ticks the scheduler skips it
+        self._last = {"eyes": None, "motion": None, "sound": None}
+        # Seconds spent in step() per tick, for comparing execution modes
+        self.tick_latency = RollingWindow(10.0)
+
+        self.current_state = "Unknown"
+        self.previous_state: Optional[str] = None
+        # Set from frame timestamps on the first tick (which may be replayed, not wall time)
+        self.state_start_time: float = time.time()
+        self.bouncing_level: int = 0
+
+        self._seq = 0
+        self._frame_seq = 0
+        self._failures = 0  # consecutive failed ticks
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._run, name="detection-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        while self._running:
+            # Newest frame only: if detection falls behind, intermediate frames are skipped
+            frame = self.ring.wait_next(self._frame_seq, timeout=0.2)
+            if frame is None:
+                continue
+            if self._frame_seq:
+                FRAMES_SKIPPED.inc(frame.seq - self._frame_seq - 1)
+            self._frame_seq = frame.seq
+            # A tick can outlast the ring (4 slots, ~130 ms at 30 fps): detect on a copy
+            frame.lores_yuv = self.ring.copy_lores(frame.slot, frame.seq)
+            if frame.lores_yuv is None:
+                FRAMES_LAPPED.inc()
+                continue
+            try:
+                self.results.publish(self.step(frame))
+                self._failures = 0
+            except Exception as exc:
+                self._log.every("loop", f"Detection loop error: {exc}", logging.ERROR)
+                # One bad tick just moves on to the next frame; only a persistent fault backs off
+                self._failures += 1
+                if self._failures >= MAX_FAILURES:
+                    time.sleep(1)
+
+    def throughput(self) -> Dict[str, float]:
+        """Ticks per second and mean/max tick latency (ms) over the last 10 seconds."""
+        window = self.tick_latency
+        span = window.span
+        return {
+            "ticks_per_second": round((len(window) - 1) / span, 1) if span > 0 else 0.0,
+            "mean_latency_ms": round(window.mean * 1000, 1),
+            "max_latency_ms": round(window.max * 1000, 1),
+        }
+
+    def _start(self, name, detector, ctx, **kwargs) -> bool:
+        """Run ``detector`` if the scheduler allows; process-backed ones are only submitted."""
+        now = ctx.timestamp
+        if self._last[name] is not None and not self.scheduler.should_run(name, now):
+            return False
+        self.scheduler.mark_run(name, now)
+        if getattr(detector, "submit", None):
+            detector.submit(ctx, **kwargs)
+        else:
+            start = time.perf_counter()
+            self._last[name] = detector.process(ctx, **kwargs)
+            DETECTOR_SECONDS[name].observe(time.perf_counter() - start)
+        return True
+
+    def _finish(self, name, detector, ctx, ran: bool):
+        """Collect a submitted run (process-backed detectors only)."""
+        if ran and getattr(detector, "submit", None):
+            self._last[name] = detector.collect(ctx)
+            DETECTOR_SECONDS[name].observe(detector.last_round_trip)
+
+    def step(self, ctx) -> DetectionResult:
+        """Run one detection tick on a FrameContext and return the published result.
+
+        All detectors share ``ctx``, so each derived image is computed once per tick.
+        Nothing is drawn here: when ``ctx.view`` was captured for viewers, the result
+        carries the overlay primitives and the stream renders them on the frames it
+        actually sends (see ``pipeline/overlay.py``). Detectors running in worker
+        processes are submitted first and collected after the local ones, so their work
+        overlaps; motion then sees the previous tick's landmarks.
+        """
+        try:
+            return self._step(ctx)
+        finally:
+            # A failed tick must not leave a worker reply behind for the next tick to collect
+            for detector in (self.eyes_detector, self.motion_detector, self.sound_detector):
+                if getattr(detector, "pending", False):
+                    detector.discard()
+
+    def _step(self, ctx) -> DetectionResult:
+        started = time.perf_counter()
+        now = ctx.timestamp
+        if self._seq == 0:
+            self.state_start_time = now
+        ran_eyes = self._start("eyes", self.eyes_detector, ctx)
+        if not getattr(self.eyes_detector, "submit", None):
+            self._finish("eyes", self.eyes_detector, ctx, ran_eyes)
+        eye_result = self._last["eyes"]
+        eyes_open = eye_result[0] if eye_result else None
+        landmarks = self.eyes_detector.last_landmarks if eyes_open in [True, False] else None
+
+        ran_motion = self._start("motion", self.motion_detector, ctx, face_landmarks=landmarks)
+        ran_sound = self._start("sound", self.sound_detector, ctx)
+        if getattr(self.eyes_detector, "submit", None):
+            self._finish("eyes", self.eyes_detector, ctx, ran_eyes)
+        self._finish("motion", self.motion_detector, ctx, ran_motion)
+        self._finish("sound", self.sound_detector, ctx, ran_sound)
+
+        eye_result = self._last["eyes"]
+        eyes_open = eye_result[0] if eye_result else None
+        processed_frame = ctx.view
+        eye_status = eye_result[2] if eye_result else ""
+        motion_state = self._last["motion"]
+        sound_state = self._last["sound"]
+        ears = getattr(self.eyes_detector, "last_ears", None)
+
+        classify_start = time.perf_counter()
+        self.current_state = self._classify_state(eye_result, motion_state, sound_state)
+
+        # Update bouncing level and state times
+        motion_data = motion_state[0] if motion_state and motion_state[0] else None
+        sound_data = sound_state[0] if sound_state and sound_state[0] else None
+        self.bouncing_level = self._update_bouncing_level(self.current_state, motion_data, sound_data, eyes_open, now)
+        self.scheduler.observe(self.current_state, motion_data, sound_data, now)
+        CLASSIFY_SECONDS.observe(time.perf_counter() - classify_start)
+
+        overlay = None
+        if processed_frame is not None:
+            overlay = Overlay(ctx.detection_shape, self._overlay_items(self.eyes_detector)
+                              + self._overlay_items(self.motion_detector) + (
+                Text(f"State: {self.current_state}", 10, 30, 0.5, (0, 0, 255)),
+                Text(f"Bouncing level: {self.bouncing_level}", 10, 50, 0.5, (0, 0, 255)),
+            ))
+            processed_frame.flags.writeable = False
+
+        self._seq += 1
+        FRAMES_PROCESSED.inc()
+        self.tick_latency.add(now, time.perf_counter() - started)
+        return DetectionResult(
+            seq=self._seq,
+            timestamp=now,
+            frame_seq=ctx.seq,
+            state=self.current_state,
+            bouncing_level=self.bouncing_level,
+            eyes_open=eyes_open,
+            eye_status=eye_status,
+            motion_data=dict(motion_data) if motion_data else None,
+            sound_data=dict(sound_data) if sound_data else None,
+            frame=processed_frame,
+            ear=float(ears.mean()) if ears is not None else None,
+            overlay=overlay,
+        )
+
+    @staticmethod
+    def _overlay_items(detector) -> tuple:
+        """Latest overlay primitives of a detector; kept from its last run on skipped ticks."""
+        overlay = getattr(detector, "overlay", None)
+        return overlay() if overlay is not None and getattr(detector, "is_active", True) else ()
+
+    def _classify_state(self, eye_state, motion_state, sound_state) -> str:
+        """Return high‑level baby state (Sleeping / Active / Crying …)."""
+        try:
+            if eye_state is None or motion_state is None or sound_state is None:
+                return "Unknown"
+
+            eyes_closed = not eye_state[0] if eye_state[0] not in [None, "Occluded"] else None
+            motion_score = motion_state[0]["motion_score"] if motion_state[0] else 0
+            subtle_motion = motion_state[0]["subtle_motion"] if motion_state[0] else 0
+            is_loud = sound_state[0]["is_loud"] if sound_state[0] else False
+            is_crying = sound_state[0]["is_crying"] if sound_state[0] else False
+
+            if eyes_closed is not None:
+                if is_crying:
+                    return "Crying"
+                if motion_score > 25 or (subtle_motion > 0 and motion_score > 10) or is_loud:
+                    return "Active"
+                if eyes_closed and motion_score < 5 and not is_loud:
+                    return "Sleeping"
+                if not eyes_closed and motion_score < 25:
+                    return "Awake/Calm"
+            elif eye_state[0] == "Occluded":
+                return "Occluded"
+            return "Unknown"
+        except Exception as exc:
+            self._log.every("classify", f"State classification error: {exc}", logging.ERROR)
+            return "Unknown"
+
+    def _update_bouncing_level(self, current_state, motion_data, sound_data, eyes_open, now=None):
+        """Update the bouncing level."""
+        try:
+            current_time = now if now is not None else time.time()
+            motion_score = motion_data['motion_score'] if motion_data else 0
+            average_motion = motion_data['average_motion'] if motion_data else 0
+            subtle_motion = motion_data['subtle_motion'] if motion_data else 0
+            motion_trend = motion_data['motion_trend'] if motion_data else 0
+            average_sound = sound_data['average_sound'] if sound_data else 0
+            is_loud = sound_data['is_loud'] if sound_data else False
+            is_crying = sound_data['is_crying'] if sound_data else False
+
+            # Update state transition tracking
+            if current_state != self.previous_state:
+                self.state_start_time = current_time
+                self.previous_state = current_state
+
+            state_duration = current_time - self.state_start_time
+
+            # Update bouncing level
+            if state_duration >= 0.5:
+                if eyes_open == "Occluded":
+                    self._log.on_change("occluded", True,
+                                        f"Bouncing level held at {self.bouncing_level} while occluded")
+                    return self.bouncing_level
+                self._log.on_change("occluded", False, "Face no longer occluded", logging.DEBUG)
+
+                if is_crying:
+                    self.bouncing_level = 3
+                elif (current_state == "Active" and average_motion > 0.8) or \
+                     (motion_trend > 0.5 and subtle_motion > 0) or \
+                     (is_loud and average_sound > 800):
+                    self.bouncing_level = 2
+                elif eyes_open or (average_motion > 0.5 and motion_score > 10) or \
+                     (average_sound > 500 and not is_crying):
+                    self.bouncing_level = 1
+                elif current_state == "Sleeping" or (motion_score < 5 and not is_loud):
+                    self.bouncing_level = 0
+
+            self._log.on_change("bouncing_level", self.bouncing_level,
+                                f"Bouncing level updated: {self.bouncing_level}")
+            return self.bouncing_level
+        except Exception as e:
+            self._log.every("bouncing", f"Error in _update_bouncing_level: {str(e)}", logging.ERROR)
+            return self.bouncing_level
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Any
+
+
+class DetectorScheduler:
+    """Decides each tick which detectors run, based on the baby's state and recent volatility.
+
+    Every detector runs at the base rate (``Config.detection_interval``) unless the baby
+    has been in a calm state for ``stable_after`` seconds with no recent activity; then
+    each detector drops to its ``calm_intervals`` entry (FaceMesh to ~1.3 Hz by default).
+    Cheap signals — motion, loud sound, a state change or frequent flapping between
+    states — start a burst that restores the base rate for ``burst_duration`` seconds.
+    """
+
+    CALM_STATES = ("Sleeping", "Awake/Calm")
+    # Fraction of an interval a run may come early, to absorb frame timestamp jitter
+    JITTER = 0.1
+
+    def __init__(self, base_interval=0.1, calm_intervals: Optional[Dict[str, float]] = None,
+                 stable_after=60.0, burst_duration=10.0, volatility_window=120.0,
+                 max_transitions=4, rate_window=10.0):
+        self.base_interval = base_interval
+        self.calm_intervals = {"eyes": 0.75, "motion": base_interval, "sound": base_interval}
+        self.calm_intervals.update(calm_intervals or {})
+        self.stable_after = stable_after
+        self.burst_duration = burst_duration
+        self.volatility_window = volatility_window
+        self.max_transitions = max_transitions
+        self.rate_window = rate_window
+
+        self.state = "Unknown"
+        self.state_since = time.time()
+        self.burst_until = 0.0
+        self._transitions: deque = deque()
+        self._last_run: Dict[str, float] = {}
+        self._first_run: Dict[str, float] = {}
+        self._runs: Dict[str, deque] = {}
+        self._rates_lock = threading.Lock()
+
+    def is_relaxed(self, now: Optional[float] = None) -> bool:
+        """True while detectors may run below the base rate."""
+        now = now if now is not None else time.time()
+        return (self.state in self.CALM_STATES
+                and now - self.state_since >= self.stable_after
+                and now >= self.burst_until
+                and len(self._transitions) < self.max_transitions)
+
+    def target_interval(self, name: str, now: Optional[float] = None) -> float:
+        if self.is_relaxed(now):
+            return max(self.base_interval, self.calm_intervals.get(name, self.base_interval))
+        return self.base_interval
+
+    def should_run(self, name: str, now: Optional[float] = None) -> bool:
+        now = now if now is not None else time.time()
+        last = self._last_run.get(name)
+        interval = self.target_interval(name, now)
+        return last is None or now - last >= interval * (1 - self.JITTER)
+
+    def mark_run(self, name: str, now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        last = self._last_run.get(name)
+        interval = self.target_interval(name, now)
+        due = last + interval if last is not None else now
+        # Anchor on when the run was due, not on the frame that ran it, so waiting for
+        # the next camera frame does not add up into a lower rate; resync after a gap
+        self._last_run[name] = due if due - interval * self.JITTER <= now < due + interval else now
+        with self._rates_lock:
+            self._first_run.setdefault(name, now)
+            runs = self._runs.setdefault(name, deque())
+            runs.append(now)
+            while runs and now - runs[0] > self.rate_window:
+                runs.popleft()
+
+    def observe(self, state: str, motion_data: Optional[Dict[str, Any]],
+                sound_data: Optional[Dict[str, Any]], now: Optional[float] = None):
+        """Feed the fused result of a tick; triggers bursts on activity."""
+        now = now if now is not None else time.time()
+        if state != self.state:
+            self.state = state
+            self.state_since = now
+            self._transitions.append(now)
+            self.burst_until = now + self.burst_duration
+        while self._transitions and now - self._transitions[0] > self.volatility_window:
+            self._transitions.popleft()
+
+        moving = bool(motion_data) and (motion_data['motion_score'] > 5 or motion_data['subtle_motion'] > 0)
+        noisy = bool(sound_data) and (sound_data['is_loud'] or sound_data['is_crying'])
+        if moving or noisy:
+            self.burst_until = now + self.burst_duration
+
+    def effective_rates(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Measured runs per second of each detector over the last ``rate_window`` seconds."""
+        now = now if now is not None else time.time()
+        rates = {}
+        with self._rates_lock:
+            for name, runs in self._runs.items():
+                recent = sum(1 for t in runs if now - t <= self.rate_window)
+                span = min(self.rate_window, now - self._first_run[name]) or self.base_interval
+                rates[name] = round(recent / span, 2)
+        return rates
@@ -0,0 +1,99 @@
+"""Overlay primitives returned by the detectors, and the renderer that draws them.
+
+Detectors describe what they would draw (landmark points, the motion ROI, status
+text) instead of drawing it. The description rides on the DetectionResult and is only
+drawn when a frame is actually sent to a viewer or served as an annotated snapshot,
+once per result, onto a copy of the frame. Nothing is drawn while nobody is watching,
+or on results the stream's frame pacing skips.
+"""
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.metrics import STAGE_SECONDS
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_SECONDS = STAGE_SECONDS.labels(stage="overlay")
+
+
+class Points(NamedTuple):
+    """Filled dots at ``points`` (N x 2, detection-image coordinates)."""
+    points: np.ndarray
+    radius: int = 2
+    color: Tuple[int, int, int] = (0, 255, 0)
+
+    def draw(self, frame, sx, sy):
+        for x, y in (self.points * np.array([sx, sy], dtype=np.float32)).astype(int):
+            cv2.circle(frame, (int(x), int(y)), self.radius, self.color, -1)
+
+
+class Rect(NamedTuple):
+    """Rectangle outline; ``x, y, w, h`` in detection-image coordinates."""
+    x: int
+    y: int
+    w: int
+    h: int
+    color: Tuple[int, int, int] = (255, 0, 0)
+    thickness: int = 2
+
+    def draw(self, frame, sx, sy):
+        cv2.rectangle(frame, (int(self.x * sx), int(self.y * sy)),
+                      (int((self.x + self.w) * sx), int((self.y + self.h) * sy)), self.color, self.thickness)
+
+
+class Text(NamedTuple):
+    """Text line; ``x, y`` are view pixels, so status lines keep their place at any size."""
+    text: str
+    x: int
+    y: int
+    scale: float = 0.4
+    color: Tuple[int, int, int] = (255, 255, 255)
+    thickness: int = 1
+
+    def draw(self, frame, sx, sy):
+        cv2.putText(frame, self.text, (self.x, self.y), FONT, self.scale, self.color, self.thickness)
+
+
+class Overlay(NamedTuple):
+    """Primitives of one tick and the detection-image shape (rows, cols) they refer to."""
+    shape: Tuple[int, int]
+    items: Tuple = ()
+
+
+def render(frame, overlay: Overlay):
+    """Draw ``overlay`` onto ``frame`` in place, scaling detection coordinates to its size."""
+    height, width = overlay.shape
+    sx, sy = frame.shape[1] / width, frame.shape[0] / height
+    for item in overlay.items:
+        item.draw(frame, sx, sy)
+
+
+class OverlayRenderer:
+    """Annotated copy of a result's frame, rendered at most once per result.
+
+    Shared by the stream hub and the snapshot cache, which both want the newest result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq: Optional[int] = None
+        self._frame = None
+
+    def annotated(self, result):
+        """The result's frame with its overlay drawn, read-only; None without a frame."""
+        if result.frame is None:
+            return None
+        if result.overlay is None:
+            return result.frame
+        with self._lock:
+            if self._seq != result.seq:
+                start = time.perf_counter()
+                frame = result.frame.copy()
+                render(frame, result.overlay)
+                OVERLAY_SECONDS.observe(time.perf_counter() - start)
+                frame.flags.writeable = False
+                self._seq, self._frame = result.seq, frame
+            return self._frame
@@ -0,0 +1,239 @@
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from camera.frame_context import FrameContext
+from detectors.landmarks import eye_overlay
+from detectors.motion_detector import motion_overlay
+from utils.logger import shutdown as flush_logs
+
+# Detector attributes mirrored back to the main process after every run
+EXPORTED_ATTRIBUTES = {
+    "eyes": ("is_active", "last_landmarks", "last_ears", "last_status_text", "track_hits", "full_searches"),
+    "motion": ("is_active", "roi", "roi_selected", "last_status_text"),
+    "sound": ("is_active", "lost_samples"),
+}
+# Detectors whose result tuple carries the (viewer) frame at index 1
+FRAME_RESULTS = ("eyes", "motion")
+
+
+def _build_detector(kind, kwargs):
+    if kind == "eyes":
+        from detectors.eyes_detector import EyeDetector
+        return EyeDetector(**kwargs)
+    if kind == "motion":
+        from detectors.motion_detector import MotionDetector
+        return MotionDetector(**kwargs)
+    if kind == "sound":
+        from detectors.sound_detector import SoundDetector
+        return SoundDetector(**kwargs)
+    raise ValueError(f"Unknown detector kind: {kind}")
+
+
+def _detector_process_main(kind, kwargs, shm, shape, ring, conn):
+    """Worker process: build the detector, then answer one request per tick."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent owns shutdown
+    logger = logging.getLogger("BabyMonitor")
+    detector = _build_detector(kind, kwargs)
+    lores = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf) if shm is not None else None
+    conn.send(("ready", detector.is_active))
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            timestamp, slot, seq, call_kwargs = request
+            try:
+                if slot is not None:
+                    # Copy the ring slot: a run may outlast the ``slots`` frame periods
+                    # before the capture loop comes back around to it
+                    frame = ring.copy_lores(slot, seq)
+                    if frame is None:
+                        conn.send(("error", f"frame {seq} was overwritten before it was read"))
+                        continue
+                    ctx = FrameContext(frame, timestamp=timestamp, seq=seq)
+                else:
+                    # The parent does not touch the slot until this reply arrives, so no copy
+                    ctx = FrameContext(lores, timestamp=timestamp) if lores is not None else None
+                result = detector.process(ctx, **call_kwargs)
+                if kind in FRAME_RESULTS:
+                    result = (result[0], None) + tuple(result[2:])
+                exported = {name: getattr(detector, name, None) for name in EXPORTED_ATTRIBUTES[kind]}
+                conn.send(("ok", (result, exported)))
+            except Exception as exc:
+                logger.error(f"{kind} worker error: {exc}")
+                conn.send(("error", str(exc)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        cleanup = getattr(detector, "cleanup", None)
+        if cleanup:
+            cleanup()
+        flush_logs()  # the process ends with os._exit, which skips atexit
+
+
+class RemoteDetector:
+    """Runs a detector in its own process; frames travel through shared memory.
+
+    Frames from a shared FrameRing are passed as a slot index; the worker copies the
+    slot itself and checks it was not overwritten. Any other frame is copied into a
+    private shared-memory slot of ``lores_shape``.
+
+    Drop-in for the detector inside DetectionWorker: ``process(ctx, **kwargs)`` returns
+    the same tuple the local detector would, and the attributes the worker reads
+    (``last_landmarks``, ``roi`` ...) are mirrored after each call. ``submit``/``collect``
+    split a call so the remote run overlaps with work in the main process.
+
+    Workers are forked, so create them before the camera and threads are started:
+    spawning would re-import ``main.py`` and a forked copy of running threads is unsafe.
+    For the same reason a worker that dies is not forked again: the detector is rebuilt
+    in this process and the proxy keeps answering from it.
+    """
+
+    def __init__(self, kind: str, lores_shape: Optional[Tuple[int, int]] = None, ring=None, **kwargs):
+        self.kind = kind
+        self.logger = logging.getLogger("BabyMonitor")
+        self.lores_shape = lores_shape
+        # Only frame detectors read ring slots; sound must not fail a tick on a lapped one
+        self.ring = ring if ring is not None and ring.shared and kind in FRAME_RESULTS else None
+        self.round_trips = 0
+        self.last_round_trip = 0.0
+        self.last_status_text = ""
+        self._detector_kwargs = kwargs
+        self._call_kwargs = {}
+        self._local = None  # in-process detector once the worker is gone
+        self._local_result = None
+        for name in EXPORTED_ATTRIBUTES[kind]:
+            setattr(self, name, None)
+
+        ctx = multiprocessing.get_context("fork")
+        self._shm = None
+        self._frame = None
+        if lores_shape is not None:
+            self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(lores_shape)))
+            self._frame = np.ndarray(lores_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_detector_process_main, name=f"detector-{kind}",
+                                    args=(kind, kwargs, self._shm, lores_shape, self.ring, child_conn),
+                                    daemon=True)
+        self._process.start()
+        self._pending = False
+        self._submitted_at = 0.0
+        status, self.is_active = self._conn.recv()
+        self.logger.info(f"{kind} detector running in process {self._process.pid} "
+                         f"({status}{'' if self.is_active else ', inactive'})")
+
+    def submit(self, ctx, **kwargs):
+        """Hand the lores frame to the worker (ring slot or shared copy) and start the run."""
+        if self._pending:
+            # The previous tick failed before collecting; its reply must not answer this run
+            self.discard()
+        self._call_kwargs = kwargs
+        self._submitted_at = time.perf_counter()
+        if self._local is not None:
+            self._local_result = self._local.process(ctx, **kwargs)
+            self._pending = True
+            return
+        slot = seq = None
+        if ctx is not None and self.ring is not None and ctx.slot is not None:
+            slot, seq = ctx.slot, ctx.seq
+        elif self._frame is not None:
+            if ctx.lores_yuv is None or ctx.lores_yuv.shape != self._frame.shape:
+                raise ValueError(f"{self.kind} worker expects a lores frame of shape {self._frame.shape}")
+            np.copyto(self._frame, ctx.lores_yuv)
+        try:
+            self._conn.send((ctx.timestamp if ctx is not None else time.time(), slot, seq, kwargs))
+        except OSError as exc:  # BrokenPipeError: the worker is gone
+            self._fall_back(exc)
+            return self.submit(ctx, **kwargs)
+        self._pending = True
+
+    def collect(self, ctx):
+        """Wait for the submitted run and mirror its state, including what ``overlay()`` needs."""
+        self._pending = False
+        if self._local is not None:
+            result, self._local_result = self._local_result, None
+            self.last_round_trip = time.perf_counter() - self._submitted_at
+            for name in EXPORTED_ATTRIBUTES[self.kind]:
+                setattr(self, name, getattr(self._local, name, None))
+            return result
+        try:
+            status, payload = self._conn.recv()
+        except (EOFError, OSError) as exc:
+            # Died mid-run: redo this tick in-process
+            self._fall_back(exc)
+            return self.process(ctx, **self._call_kwargs)
+        self.round_trips += 1
+        self.last_round_trip = time.perf_counter() - self._submitted_at
+        if status != "ok":
+            raise RuntimeError(f"{self.kind} worker failed: {payload}")
+        result, exported = payload
+        for name, value in exported.items():
+            setattr(self, name, value)
+        if self.kind in FRAME_RESULTS:
+            result = (result[0], ctx.view) + tuple(result[2:])
+        return result
+
+    @property
+    def pending(self) -> bool:
+        return self._pending
+
+    def process(self, ctx, **kwargs):
+        self.submit(ctx, **kwargs)
+        return self.collect(ctx)
+
+    def discard(self):
+        """Drop the reply of a run nobody will collect (its tick failed meanwhile)."""
+        if not self._pending:
+            return
+        self._pending = False
+        self._local_result = None
+        if self._local is None:
+            try:
+                self._conn.recv()
+            except (EOFError, OSError) as exc:
+                self._fall_back(exc)
+
+    def _fall_back(self, exc):
+        self.logger.error(f"{self.kind} worker process {self._process.pid} lost ({exc!r}), "
+                          f"running the detector in-process")
+        self._pending = False
+        self._local = _build_detector(self.kind, self._detector_kwargs)
+        self._conn.close()
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join(timeout=2.0)
+
+    def overlay(self):
+        if self.kind == "eyes":
+            return eye_overlay(self.last_landmarks, self.last_status_text)
+        if self.kind == "motion":
+            return motion_overlay(self.roi, self.last_status_text)
+        return ()
+
+    def cleanup(self):
+        if self._local is not None:
+            cleanup = getattr(self._local, "cleanup", None)
+            if cleanup:
+                cleanup()
+        else:
+            try:
+                if self._pending:
+                    self._conn.recv()
+                self._conn.send(None)
+                self._process.join(timeout=2.0)
+            except (OSError, EOFError):
+                pass
+        if self._process.is_alive():
+            self._process.terminate()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    release = cleanup
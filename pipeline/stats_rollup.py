@@ -0,0 +1,244 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from storage.state_store import STATE_GROUPS, StateStore
+
+MINUTE = 60
+HOUR = 3600
+
+
+class _Bucket:
+    """Seconds per state and feature sums for one minute, hour or night."""
+
+    __slots__ = ("start", "end", "label", "states", "samples", "motion_sum", "ear_sum", "ear_count",
+                 "amplitude_sum", "amplitude_max", "bouncing_max")
+
+    def __init__(self, start, end, label=None):
+        self.start = start
+        self.end = end
+        self.label = label
+        self.states: Dict[str, float] = {}
+        self.samples = 0
+        self.motion_sum = 0.0
+        self.ear_sum = 0.0
+        self.ear_count = 0
+        self.amplitude_sum = 0.0
+        self.amplitude_max = 0.0
+        self.bouncing_max = 0
+
+    def add_sample(self, result):
+        motion = result.motion_data or {}
+        amplitude = (result.sound_data or {}).get("current_amplitude") or 0.0
+        self.samples += 1
+        self.motion_sum += motion.get("motion_score") or 0.0
+        if result.ear is not None:
+            self.ear_sum += result.ear
+            self.ear_count += 1
+        self.amplitude_sum += amplitude
+        self.amplitude_max = max(self.amplitude_max, amplitude)
+        self.bouncing_max = max(self.bouncing_max, result.bouncing_level)
+
+    def to_dict(self):
+        states = {state: round(seconds, 1) for state, seconds in self.states.items()}
+        entry = {"start": self.start, "states": states, "groups": StateStore.group(self.states)}
+        if self.label is not None:
+            entry = {"night": self.label, "end": self.end, **entry}
+        if self.samples:
+            entry.update(
+                motion_avg=round(self.motion_sum / self.samples, 2),
+                ear_avg=round(self.ear_sum / self.ear_count, 3) if self.ear_count else None,
+                amplitude_avg=round(self.amplitude_sum / self.samples, 1),
+                amplitude_max=round(self.amplitude_max, 1),
+                bouncing_max=self.bouncing_max,
+            )
+        return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an ``If-None-Match`` header value names ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class StatsRollup:
+    """Per-minute, per-hour and per-night statistics, kept current as ticks arrive.
+
+    Another follower of the DetectionWorker's ResultChannel. Each result credits the
+    time since the previous one to the current state in the minute, hour and night
+    buckets it falls in, and adds its features to them. The hours and nights already in
+    the StateStore are loaded once at start, so the numbers survive restarts.
+
+    At most every ``publish_interval`` seconds, or immediately on a state change, the
+    buckets are serialized into one JSON body with a new ETag. Requests only read that
+    body, so an unchanged poll costs a header comparison and a 304.
+    """
+
+    def __init__(self, results, store: Optional[StateStore] = None, minutes=60, hours=24, nights=7,
+                 publish_interval=5.0, night_hours=(19, 7)):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.results = results
+        self.publish_interval = publish_interval
+        self.night_hours = night_hours
+        self.minutes: deque = deque(maxlen=minutes)
+        self.hours: deque = deque(maxlen=hours)
+        self.nights: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self.max_nights = nights
+
+        self._state: Optional[str] = None
+        self._since = 0.0
+        self._level = 0
+        self._last_ts: Optional[float] = None
+        self._night: Optional[_Bucket] = None
+        self._version = 0
+        self._dirty = True
+        self._published: Tuple[str, bytes, dict] = ("", b"", {})
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        if store is not None:
+            self._load(store)
+        self.publish()
+
+    def _load(self, store: StateStore):
+        now = time.time()
+        for entry in store.hourly(now - (self.hours.maxlen - 1) * HOUR, now):
+            bucket = _Bucket(entry["hour"], entry["hour"] + HOUR)
+            bucket.states.update(entry["states"])
+            samples = entry.get("samples") or 0
+            if samples:
+                bucket.samples = samples
+                bucket.motion_sum = entry["motion_avg"] * samples
+                if entry["ear_avg"] is not None:
+                    bucket.ear_sum, bucket.ear_count = entry["ear_avg"] * samples, samples
+                bucket.amplitude_sum = entry["amplitude_avg"] * samples
+                bucket.amplitude_max = entry["amplitude_max"]
+                bucket.bouncing_max = entry["bouncing_max"]
+            self.hours.append(bucket)
+        for entry in reversed(store.nights(self.max_nights, now)):
+            bucket = _Bucket(entry["start"], entry["end"], entry["night"])
+            bucket.states.update(entry["states"])
+            self.nights[bucket.label] = bucket
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="stats-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        last_seq = 0
+        next_publish = time.monotonic() + self.publish_interval
+        while self._running:
+            try:
+                result = self.results.wait_next(last_seq, timeout=0.5)
+                if result is not None:
+                    last_seq = result.seq
+                    if self.observe(result):
+                        next_publish = 0.0  # state changed: publish now
+                if self._dirty and time.monotonic() >= next_publish:
+                    self.publish()
+                    next_publish = time.monotonic() + self.publish_interval
+            except Exception as exc:
+                self.logger.error(f"Stats rollup error: {exc}")
+                time.sleep(1)
+
+    def observe(self, result) -> bool:
+        """Fold one DetectionResult into the buckets; True if the state changed."""
+        ts = result.timestamp
+        if self._last_ts is not None and ts > self._last_ts:
+            self._credit(self._state, self._last_ts, ts)
+        self._last_ts = ts
+        self._level = result.bouncing_level
+        minute = self._bucket(self.minutes, ts, MINUTE)
+        minute.add_sample(result)
+        self._bucket(self.hours, ts, HOUR).add_sample(result)
+        night = self._night_bucket(ts)
+        if night is not None:
+            night.add_sample(result)
+        self._dirty = True
+        if result.state != self._state:
+            self._state, self._since = result.state, ts
+            return True
+        return False
+
+    def _credit(self, state, start, end):
+        """Add ``start``..``end`` to ``state``, split at minute boundaries (so hours and nights are exact)."""
+        while end > start:
+            chunk_end = min(end, (start // MINUTE + 1) * MINUTE)
+            seconds = chunk_end - start
+            for bucket in (self._bucket(self.minutes, start, MINUTE), self._bucket(self.hours, start, HOUR),
+                           self._night_bucket(start)):
+                if bucket is not None:
+                    bucket.states[state] = bucket.states.get(state, 0.0) + seconds
+            start = chunk_end
+
+    @staticmethod
+    def _bucket(buckets: deque, ts: float, width: int) -> _Bucket:
+        start = int(ts // width) * width
+        if buckets and buckets[-1].start == start:
+            return buckets[-1]
+        for bucket in reversed(buckets):
+            if bucket.start == start:
+                return bucket
+        bucket = _Bucket(start, start + width)
+        buckets.append(bucket)
+        return bucket
+
+    def _night_bucket(self, ts: float) -> Optional[_Bucket]:
+        night = self._night
+        if night is None or not (night.start <= ts < night.end):
+            day = datetime.fromtimestamp(ts)
+            if day.hour < self.night_hours[1]:
+                day -= timedelta(days=1)
+            start_hour, end_hour = self.night_hours
+            start = day.replace(hour=start_hour, minute=0, second=0, microsecond=0).timestamp()
+            end = (day + timedelta(days=1)).replace(hour=end_hour, minute=0, second=0, microsecond=0).timestamp()
+            if not start <= ts < end:
+                return None  # daytime
+            label = day.strftime("%Y-%m-%d")
+            night = self.nights.get(label)
+            if night is None:
+                night = self.nights[label] = _Bucket(start, end, label)
+                while len(self.nights) > self.max_nights:
+                    self.nights.popitem(last=False)
+            self._night = night
+        return night
+
+    def publish(self):
+        """Serialize the buckets into the body served until the next publish."""
+        self._version += 1
+        now = time.time()
+        last_hours = [b for b in self.hours if b.start > now - self.hours.maxlen * HOUR]
+        totals: Dict[str, float] = {}
+        for bucket in last_hours:
+            for state, seconds in bucket.states.items():
+                totals[state] = totals.get(state, 0.0) + seconds
+        data = {
+            "version": self._version,
+            "generated": round(now, 3),
+            "current": {"state": self._state, "since": self._since, "bouncing_level": self._level},
+            "last_24h": {"states": {k: round(v, 1) for k, v in totals.items()},
+                         "groups": StateStore.group(totals)},
+            "minutes": [b.to_dict() for b in self.minutes if b.start > now - self.minutes.maxlen * MINUTE],
+            "hours": [b.to_dict() for b in last_hours],
+            "nights": [b.to_dict() for b in reversed(self.nights.values())],
+            "state_groups": STATE_GROUPS,
+        }
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self._published = (f'"{self._version}-{int(now)}"', body, data)
+        self._dirty = False
+
+    def current(self) -> Tuple[str, bytes, dict]:
+        """``(etag, json_body, data)`` of the last publish."""
+        return self._published
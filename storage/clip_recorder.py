@@ -0,0 +1,232 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import cv2
+
+from utils.metrics import REGISTRY
+from utils.recording import LORES, AUDIO, write_header, write_record
+
+CLIPS_WRITTEN = REGISTRY.counter("beshique_clips_written_total", "Event clips written to disk")
+CLIP_RECORDS_DROPPED = REGISTRY.counter("beshique_clip_records_dropped_total",
+                                        "Clip frames/audio chunks dropped because the writer fell behind")
+
+
+class ClipRecorder:
+    """Writes a clip around every switch into a trigger state (Crying, Active).
+
+    A background thread follows the FrameRing and its own audio-ring cursor, like the
+    SessionRecorder. It converts lores frames to BGR at ``fps`` and JPEG-encodes them
+    into a pre-roll ring, which holds at most ``pre_roll`` seconds and
+    ``pre_roll_bytes``, so RAM use is fixed. When the latest detection result enters a
+    trigger state, the pre-roll and everything up to ``post_roll`` seconds after the
+    event go to a writer thread through a bounded queue. Another trigger during a clip
+    extends it, up to ``max_clip`` seconds. Records the writer cannot keep up with are
+    dropped, never waited for, and detection is never involved.
+
+    Clips use the session recording format (``utils/recording.py``), marked
+    ``"lores_format": "bgr"`` so each frame is a viewable colour picture and replays
+    (``BESHIQUE_REPLAY``) convert it back to I420. The directory is trimmed to
+    ``max_clips`` files and ``max_bytes``, oldest first. Since it encodes frames all
+    night whether or not anyone watches, the recorder only runs when
+    ``BESHIQUE_CLIP_DIR`` is set.
+    """
+
+    def __init__(self, directory, ring, results, audio_ring=None, audio_rate=44100, audio_channels=1,
+                 chunk_size=1024, trigger_states=("Crying", "Active"), pre_roll=10.0, post_roll=20.0,
+                 max_clip=120.0, fps=10.0, jpeg_quality=80, pre_roll_bytes=8 * 1024 * 1024,
+                 max_clips=50, max_bytes=500 * 1024 * 1024, queue_size=256):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.directory = directory
+        self.ring = ring
+        self.results = results
+        self.audio_ring = audio_ring
+        self.audio_rate = audio_rate
+        self.audio_channels = audio_channels
+        self.chunk_size = chunk_size
+        self.trigger_states = tuple(trigger_states)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_clip = max_clip
+        self.frame_interval = 1.0 / fps
+        self.jpeg_quality = jpeg_quality
+        self.pre_roll_bytes = pre_roll_bytes
+        self.max_clips = max_clips
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._pre_roll: deque = deque()  # (kind, timestamp, payload)
+        self._pre_roll_size = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._clip_start: Optional[float] = None
+        self._clip_end = 0.0
+        self._last_state: Optional[str] = None
+        self._last_result_seq = 0
+        self._audio_pos = audio_ring.write_pos if audio_ring is not None else 0
+        self.clips_written = 0
+        self.dropped = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._writer: Optional[threading.Thread] = None
+
+    @property
+    def recording(self) -> bool:
+        return self._clip_start is not None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="clip-recorder", daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="clip-writer", daemon=True)
+        self._thread.start()
+        self._writer.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.recording:
+            self._finish_clip()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+
+    # Capture side (clip-recorder thread)
+
+    def _run(self):
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        last_seq, last_frame = 0, 0.0
+        while self._running:
+            try:
+                self._drain_audio()
+                self._check_trigger()
+                ctx = self.ring.wait_next(last_seq, timeout=0.05, copy_main=False)
+                if ctx is None:
+                    continue
+                last_seq = ctx.seq
+                if ctx.timestamp - last_frame < self.frame_interval * 0.9:
+                    continue
+                jpeg = cv2.imencode(".jpg", cv2.cvtColor(ctx.lores_yuv, cv2.COLOR_YUV2BGR_I420), params)[1]
+                if not self.ring.is_current(ctx.slot, ctx.seq):
+                    continue  # lapped while encoding
+                last_frame = ctx.timestamp
+                self._add(LORES, ctx.timestamp, jpeg.tobytes())
+                if self.recording and ctx.timestamp >= self._clip_end:
+                    self._finish_clip()
+            except Exception as exc:
+                self.logger.error(f"Clip recorder error: {exc}")
+                time.sleep(1)
+
+    def _drain_audio(self):
+        if self.audio_ring is None:
+            return
+        samples, self._audio_pos, _ = self.audio_ring.read_since(self._audio_pos, self.chunk_size)
+        if len(samples):
+            # The ring has no timestamps: the newest sample was captured about now
+            end = time.time()
+            for i, chunk in enumerate(samples.reshape(-1, self.chunk_size)):
+                remaining = len(samples) - (i + 1) * self.chunk_size
+                self._add(AUDIO, end - remaining / self.audio_rate, chunk.astype("<i2").tobytes())
+
+    def _check_trigger(self):
+        result = self.results.latest()
+        if result is None or result.seq == self._last_result_seq:
+            return
+        self._last_result_seq = result.seq
+        entered = result.state != self._last_state and result.state in self.trigger_states
+        self._last_state = result.state
+        if not entered:
+            return
+        if self.recording:
+            self._clip_end = min(result.timestamp + self.post_roll, self._clip_start + self.max_clip)
+            return
+        self._clip_start = result.timestamp
+        self._clip_end = result.timestamp + self.post_roll
+        name = time.strftime("clip-%Y%m%d-%H%M%S", time.localtime(result.timestamp))
+        path = os.path.join(self.directory, f"{name}-{result.state.replace('/', '-')}.bsq")
+        header = {
+            "version": 1,
+            "lores_shape": list(self.ring.lores_shape),
+            "lores_format": "bgr",
+            "main_shape": None,
+            "audio_rate": self.audio_rate,
+            "audio_channels": self.audio_channels,
+            "chunk_size": self.chunk_size,
+            "started": self._pre_roll[0][1] if self._pre_roll else result.timestamp,
+            "trigger": result.state,
+            "event_time": result.timestamp,
+            "bouncing_level": result.bouncing_level,
+        }
+        self._queue.put(("open", path, header))
+        self.logger.info(f"Clip triggered by {result.state}: {path}")
+        while self._pre_roll:
+            self._send(self._pre_roll.popleft())
+        self._pre_roll_size = 0
+
+    def _add(self, kind, timestamp, payload):
+        record = (kind, timestamp, payload)
+        if self.recording:
+            self._send(record)
+            return
+        self._pre_roll.append(record)
+        self._pre_roll_size += len(payload)
+        while self._pre_roll and (self._pre_roll_size > self.pre_roll_bytes
+                                  or self._pre_roll[0][1] < timestamp - self.pre_roll):
+            self._pre_roll_size -= len(self._pre_roll.popleft()[2])
+
+    def _send(self, record):
+        try:
+            self._queue.put_nowait(("record",) + record)
+        except queue.Full:
+            self.dropped += 1
+            CLIP_RECORDS_DROPPED.inc()
+
+    def _finish_clip(self):
+        self._clip_start = None
+        self._queue.put(("close",))
+
+    # Disk side (clip-writer thread)
+
+    def _write_loop(self):
+        file, path = None, None
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                if item[0] == "open":
+                    if file is not None:
+                        self._close(file, path)
+                    path = item[1]
+                    file = open(path + ".part", "wb")
+                    write_header(file, item[2])
+                elif item[0] == "record" and file is not None:
+                    write_record(file, item[1], item[2], item[3])
+                elif item[0] == "close" and file is not None:
+                    self._close(file, path)
+                    file = None
+            except Exception as exc:
+                self.logger.error(f"Clip writer error: {exc}")
+        if file is not None:
+            self._close(file, path)
+
+    def _close(self, file, path):
+        file.close()
+        os.replace(path + ".part", path)
+        self.clips_written += 1
+        CLIPS_WRITTEN.inc()
+        self.logger.info(f"Clip written: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+        self._enforce_limits(keep=path)
+
+    def _enforce_limits(self, keep):
+        clips = sorted((os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                        if name.endswith(".bsq")), key=os.path.getmtime)
+        total = sum(os.path.getsize(clip) for clip in clips)
+        while clips and (len(clips) > self.max_clips or total > self.max_bytes) and clips[0] != keep:
+            oldest = clips.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+            self.logger.info(f"Clip removed to stay within limits: {oldest}")
@@ -0,0 +1,301 @@
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+HOUR = 3600
+# Rows of the legacy three-counter statistics and the classified states they add up
+STATE_GROUPS = {
+    "Sleeping": ("Sleeping",),
+    "Active": ("Active", "Awake/Calm"),
+    "Crying": ("Crying",),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    ts REAL NOT NULL,
+    state TEXT NOT NULL,
+    bouncing_level INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_ts ON transitions (ts);
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL NOT NULL,
+    state TEXT NOT NULL,
+    bouncing_level INTEGER NOT NULL,
+    motion_score REAL,
+    average_motion REAL,
+    ear REAL,
+    amplitude REAL,
+    is_crying INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS hourly_states (
+    hour INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (hour, state)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hourly_features (
+    hour INTEGER PRIMARY KEY,
+    samples INTEGER NOT NULL,
+    motion_sum REAL NOT NULL,
+    ear_sum REAL NOT NULL,
+    ear_count INTEGER NOT NULL,
+    amplitude_sum REAL NOT NULL,
+    amplitude_max REAL NOT NULL,
+    bouncing_max INTEGER NOT NULL
+);
+"""
+
+
+def _hour(ts: float) -> int:
+    return int(ts // HOUR) * HOUR
+
+
+class StateStore:
+    """Persistent history of baby states and feature samples in SQLite (WAL mode).
+
+    Like the BroadcastHub, the store follows the DetectionWorker's ResultChannel from
+    its own thread, so detection never waits for the SD card. That thread appends
+    state transitions and a feature sample every ``sample_interval`` seconds, and keeps
+    hourly rollups (seconds per state, feature sums) up to date. Everything is written
+    in one transaction every ``flush_interval`` seconds.
+
+    Queries read only the hourly rollups, except ``transitions``/``samples`` which
+    return raw rows. Raw rows are kept ``retention_days``, rollups
+    ``rollup_retention_days``. Time between a shutdown and the next start is not
+    credited to any state. ``path=None`` keeps the history in memory (replays).
+    """
+
+    def __init__(self, path: Optional[str], results=None, sample_interval=5.0, flush_interval=2.0,
+                 retention_days=14, rollup_retention_days=400, night_hours=(19, 7)):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.path = path
+        self.results = results
+        self.sample_interval = sample_interval
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.night_hours = night_hours
+
+        if path is None:
+            # Shared-cache memory database, so the reader connection sees the writer's data
+            target, uri = f"file:beshique-state-{id(self)}?mode=memory&cache=shared", True
+        else:
+            target, uri = path, False
+        self._db = sqlite3.connect(target, uri=uri, check_same_thread=False, isolation_level=None)
+        if path is not None:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; fsync at checkpoints
+        self._db.executescript(_SCHEMA)
+        self._reader = sqlite3.connect(target, uri=uri, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+        # Pending batch, touched only by the writer thread (or by observe() when driven directly)
+        self._transitions: List[tuple] = []
+        self._samples: List[tuple] = []
+        self._state_seconds: Dict[tuple, List[float]] = {}  # (hour, state) -> [seconds, entries]
+        self._features: Dict[int, List[float]] = {}
+        self._state: Optional[str] = None
+        self._since = 0.0
+        self._last_ts = 0.0
+        self._last_sample = 0.0
+        self._next_prune = 0.0
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="state-store", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._db is None:
+            return
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.flush()
+        self._reader.close()
+        self._db.close()
+        self._db = None
+
+    def _run(self):
+        last_seq = 0
+        next_flush = time.monotonic() + self.flush_interval
+        while self._running:
+            try:
+                result = self.results.wait_next(last_seq, timeout=0.5)
+                if result is not None:
+                    last_seq = result.seq
+                    self.observe(result)
+                if time.monotonic() >= next_flush:
+                    self.flush()
+                    next_flush = time.monotonic() + self.flush_interval
+            except Exception as exc:
+                self.logger.error(f"State store error: {exc}")
+                time.sleep(1)
+
+    def observe(self, result):
+        """Fold one DetectionResult into the pending batch."""
+        ts, state = result.timestamp, result.state
+        if state != self._state:
+            if self._state is not None:
+                self._credit(self._state, self._since, ts)
+            self._transitions.append((ts, state, result.bouncing_level))
+            self._state_seconds.setdefault((_hour(ts), state), [0.0, 0])[1] += 1
+            self._state, self._since = state, ts
+        self._last_ts = ts
+
+        if ts - self._last_sample >= self.sample_interval:
+            self._last_sample = ts
+            motion = result.motion_data or {}
+            sound = result.sound_data or {}
+            ear = result.ear
+            amplitude = sound.get("current_amplitude")
+            self._samples.append((ts, state, result.bouncing_level, motion.get("motion_score"),
+                                  motion.get("average_motion"), ear, amplitude,
+                                  int(bool(sound.get("is_crying")))))
+            feature = self._features.setdefault(_hour(ts), [0, 0.0, 0.0, 0, 0.0, 0.0, 0])
+            feature[0] += 1
+            feature[1] += motion.get("motion_score") or 0.0
+            if ear is not None:
+                feature[2] += ear
+                feature[3] += 1
+            feature[4] += amplitude or 0.0
+            feature[5] = max(feature[5], amplitude or 0.0)
+            feature[6] = max(feature[6], result.bouncing_level)
+
+    def _credit(self, state, start, end):
+        """Add ``start``..``end`` to ``state``, split at hour boundaries."""
+        while end > start:
+            hour = _hour(start)
+            chunk_end = min(end, hour + HOUR)
+            self._state_seconds.setdefault((hour, state), [0.0, 0])[0] += chunk_end - start
+            start = chunk_end
+
+    def flush(self):
+        """Write the pending batch in one transaction; the open state is credited up to now."""
+        if self._state is not None and self._last_ts > self._since:
+            self._credit(self._state, self._since, self._last_ts)
+            self._since = self._last_ts
+        if not (self._transitions or self._samples or self._state_seconds or self._features):
+            return
+        transitions, self._transitions = self._transitions, []
+        samples, self._samples = self._samples, []
+        state_seconds, self._state_seconds = self._state_seconds, {}
+        features, self._features = self._features, {}
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            db.executemany("INSERT INTO transitions VALUES (?, ?, ?)", transitions)
+            db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", samples)
+            db.executemany(
+                "INSERT INTO hourly_states VALUES (?, ?, ?, ?) ON CONFLICT (hour, state) DO UPDATE SET "
+                "seconds = seconds + excluded.seconds, entries = entries + excluded.entries",
+                [(hour, state, seconds, entries) for (hour, state), (seconds, entries) in state_seconds.items()])
+            db.executemany(
+                "INSERT INTO hourly_features VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (hour) DO UPDATE SET "
+                "samples = samples + excluded.samples, motion_sum = motion_sum + excluded.motion_sum, "
+                "ear_sum = ear_sum + excluded.ear_sum, ear_count = ear_count + excluded.ear_count, "
+                "amplitude_sum = amplitude_sum + excluded.amplitude_sum, "
+                "amplitude_max = MAX(amplitude_max, excluded.amplitude_max), "
+                "bouncing_max = MAX(bouncing_max, excluded.bouncing_max)",
+                [(hour, *values) for hour, values in features.items()])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if self._last_ts >= self._next_prune:
+            self._prune(self._last_ts)
+            self._next_prune = self._last_ts + HOUR
+
+    def _prune(self, now):
+        raw_cutoff = now - self.retention_days * 86400
+        rollup_cutoff = now - self.rollup_retention_days * 86400
+        with self._db:
+            self._db.execute("DELETE FROM transitions WHERE ts < ?", (raw_cutoff,))
+            self._db.execute("DELETE FROM samples WHERE ts < ?", (raw_cutoff,))
+            self._db.execute("DELETE FROM hourly_states WHERE hour < ?", (rollup_cutoff,))
+            self._db.execute("DELETE FROM hourly_features WHERE hour < ?", (rollup_cutoff,))
+
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def totals(self, start: float, end: float) -> Dict[str, float]:
+        """Seconds per classified state in the hours overlapping ``start``..``end``."""
+        rows = self._query("SELECT state, SUM(seconds) FROM hourly_states WHERE hour >= ? AND hour < ? "
+                           "GROUP BY state", (_hour(start), end))
+        return {state: seconds for state, seconds in rows}
+
+    def hourly(self, start: float, end: float) -> List[dict]:
+        """One entry per hour with data: seconds per state and feature averages."""
+        hours: Dict[int, dict] = {}
+        for hour, state, seconds, entries in self._query(
+                "SELECT hour, state, seconds, entries FROM hourly_states WHERE hour >= ? AND hour < ? "
+                "ORDER BY hour", (_hour(start), end)):
+            entry = hours.setdefault(hour, {"hour": hour, "states": {}, "entries": {}})
+            entry["states"][state] = round(seconds, 1)
+            entry["entries"][state] = entries
+        for hour, samples, motion_sum, ear_sum, ear_count, amplitude_sum, amplitude_max, bouncing_max in self._query(
+                "SELECT * FROM hourly_features WHERE hour >= ? AND hour < ?", (_hour(start), end)):
+            entry = hours.setdefault(hour, {"hour": hour, "states": {}, "entries": {}})
+            entry.update(
+                samples=samples,
+                motion_avg=round(motion_sum / samples, 2) if samples else None,
+                ear_avg=round(ear_sum / ear_count, 3) if ear_count else None,
+                amplitude_avg=round(amplitude_sum / samples, 1) if samples else None,
+                amplitude_max=round(amplitude_max, 1),
+                bouncing_max=bouncing_max,
+            )
+        return [hours[hour] for hour in sorted(hours)]
+
+    def night_bounds(self, day: datetime):
+        """Start and end timestamps of the night that begins on the evening of ``day`` (local time)."""
+        start_hour, end_hour = self.night_hours
+        start = day.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        end = (day + timedelta(days=1)).replace(hour=end_hour, minute=0, second=0, microsecond=0)
+        return start.timestamp(), end.timestamp()
+
+    def nights(self, count=7, now: Optional[float] = None) -> List[dict]:
+        """Per-night state totals, most recent night (possibly in progress) first."""
+        now = now if now is not None else time.time()
+        today = datetime.fromtimestamp(now)
+        # Before the morning end hour we are still in the night that started yesterday
+        if today.hour < self.night_hours[1]:
+            today -= timedelta(days=1)
+        nights = []
+        for i in range(count):
+            day = today - timedelta(days=i)
+            start, end = self.night_bounds(day)
+            if start > now:
+                continue
+            states = self.totals(start, end)
+            if not states:
+                continue
+            nights.append({"night": day.strftime("%Y-%m-%d"), "start": start, "end": end,
+                           "states": {k: round(v, 1) for k, v in states.items()},
+                           "groups": self.group(states)})
+        return nights
+
+    @staticmethod
+    def group(states: Dict[str, float]) -> Dict[str, float]:
+        """Collapse classified states into the Sleeping/Active/Crying counters."""
+        return {name: round(sum(states.get(s, 0.0) for s in members), 1)
+                for name, members in STATE_GROUPS.items()}
+
+    def transitions(self, start: float, end: float, limit=500) -> List[tuple]:
+        """Raw ``(ts, state, bouncing_level)`` rows, oldest first."""
+        return self._query("SELECT ts, state, bouncing_level FROM transitions WHERE ts >= ? AND ts < ? "
+                           "ORDER BY ts LIMIT ?", (start, end, limit))
+
+    def samples(self, start: float, end: float, limit=1000) -> List[tuple]:
+        """Raw feature samples ``(ts, state, bouncing_level, motion_score, average_motion, ear,
+        amplitude, is_crying)``, oldest first."""
+        return self._query("SELECT * FROM samples WHERE ts >= ? AND ts < ? ORDER BY ts LIMIT ?",
+                           (start, end, limit))
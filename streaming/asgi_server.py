@@ -0,0 +1,276 @@
+import asyncio
+import base64
+import binascii
+import logging
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+
+from pipeline.stats_rollup import etag_matches
+from utils.metrics import REGISTRY, CONTENT_TYPE, STAGE_SECONDS
+from . import templates
+from .broadcast_hub import Subscription, FRAMES_SENT, FRAMES_DROPPED
+from .state_events import AsyncEventListener, HEARTBEAT, RETRY
+
+SEND_SECONDS = STAGE_SECONDS.labels(stage="send")
+
+BOUNDARY = b"frame"
+
+
+class AsyncSubscription(Subscription):
+    """Subscription whose frames are awaited on an event loop instead of a blocked thread.
+
+    The hub thread calls ``offer``. The frame is handed to the loop with
+    ``call_soon_threadsafe``, so each viewer costs one coroutine, not one OS thread.
+    """
+
+    def __init__(self, client_id: str, loop: asyncio.AbstractEventLoop):
+        super().__init__(client_id)
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def offer(self, jpeg: bytes):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, jpeg)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _deliver(self, jpeg: bytes):
+        if self._pending is not None:
+            self.dropped += 1
+            FRAMES_DROPPED.inc()
+        self._pending = jpeg
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Await the pending frame for up to ``timeout``; None if nothing arrived."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        jpeg, self._pending = self._pending, None
+        if jpeg is not None:
+            self.sent += 1
+            self.sent_bytes += len(jpeg)
+            FRAMES_SENT.inc()
+        return jpeg
+
+    def close(self):
+        self.closed = True
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass
+
+
+class MonitorASGIApp:
+    """Raw ASGI app serving the monitor's pages and MJPEG stream from one event loop.
+
+    Routes and basic auth match the Flask app in ``main.py``. ``verify_password`` is the
+    same callable Flask uses. ``configure_wifi(ssid, password)`` handles the /setup form
+    and runs in the default executor because it shells out to nmcli.
+    """
+
+    def __init__(self, monitor, verify_password, configure_wifi, realm="Authentication Required"):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.monitor = monitor
+        self.verify_password = verify_password
+        self.configure_wifi = configure_wifi
+        self.realm = realm
+        self.routes = {
+            "/": self.index,
+            "/video_feed": self.video_feed,
+            "/events": self.events,
+            "/snapshot.jpg": self.snapshot,
+            "/statistics": self.statistics,
+            "/api/stats": self.api_stats,
+            "/setup": self.setup,
+            "/metrics": self.metrics,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        handler = self.routes.get(scope["path"])
+        if handler is None:
+            await self._respond(send, 404, b"Not Found")
+            return
+        if not self._authorized(scope):
+            await self._respond(send, 401, b"Unauthorized Access",
+                                [(b"www-authenticate", f'Basic realm="{self.realm}"'.encode())])
+            return
+        try:
+            await handler(scope, receive, send)
+        except Exception as exc:
+            self.logger.error(f"ASGI handler error on {scope['path']}: {exc}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _authorized(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"authorization" and value[:6].lower() == b"basic ":
+                try:
+                    username, _, password = base64.b64decode(value[6:]).decode("utf-8").partition(":")
+                except (binascii.Error, UnicodeDecodeError):
+                    return False
+                return bool(self.verify_password(username, password))
+        return False
+
+    @staticmethod
+    async def _respond(send, status, body: bytes, headers=None, content_type=b"text/plain; charset=utf-8"):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type),
+                                (b"content-length", str(len(body)).encode())] + (headers or [])})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _html(self, send, template, **context):
+        await self._respond(send, 200, templates.render(template, **context).encode(),
+                            content_type=b"text/html; charset=utf-8")
+
+    async def index(self, scope, receive, send):
+        await self._html(send, templates.INDEX_HTML)
+
+    async def statistics(self, scope, receive, send):
+        await self._html(send, templates.STATISTICS_HTML, **self.monitor.statistics_context())
+
+    async def api_stats(self, scope, receive, send):
+        etag, body, _ = self.monitor.stats.current()
+        headers = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+        if_none_match = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"if-none-match"), None)
+        if etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._respond(send, 200, body, headers, content_type=b"application/json")
+
+    async def metrics(self, scope, receive, send):
+        await self._respond(send, 200, REGISTRY.render().encode(), content_type=CONTENT_TYPE.encode())
+
+    async def snapshot(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        headers = dict(scope["headers"])
+        # A new frame is encoded by the first request for it; keep that off the event loop
+        loop = asyncio.get_running_loop()
+        status, body, response_headers = await loop.run_in_executor(
+            None, self.monitor.snapshots.respond,
+            query.get("annotated", [""])[0] in ("1", "true", "yes"),
+            headers.get(b"if-none-match", b"").decode("latin-1") or None,
+            headers.get(b"if-modified-since", b"").decode("latin-1") or None)
+        extra = [(k.lower().encode(), v.encode()) for k, v in response_headers.items()]
+        if status == 304:
+            await send({"type": "http.response.start", "status": 304, "headers": extra})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._respond(send, status, body, extra,
+                            content_type=b"image/jpeg" if status == 200 else b"text/plain; charset=utf-8")
+
+    async def setup(self, scope, receive, send):
+        if scope["method"] != "POST":
+            await self._html(send, templates.SETUP_HTML)
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        # Blank values are kept: like Flask's request.form, only a missing field is a 400
+        try:
+            form = parse_qs(body.decode("utf-8"), keep_blank_values=True, errors="strict")
+        except UnicodeDecodeError:
+            await self._respond(send, 400, b"Form is not valid UTF-8")
+            return
+        if "ssid" not in form or "password" not in form:
+            await self._respond(send, 400, b"Missing ssid or password")
+            return
+        ssid = form["ssid"][0]
+        password = form["password"][0]
+        loop = asyncio.get_running_loop()
+        message = await loop.run_in_executor(None, self.configure_wifi, ssid, password)
+        await self._respond(send, 200, message.encode(), content_type=b"text/html; charset=utf-8")
+
+    async def video_feed(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        client = scope.get("client") or ("client", 0)
+        query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        try:
+            profile, auto = self.monitor.hub.parse_profile(query)
+        except ValueError:
+            await self._respond(send, 400, b"Bad stream parameters")
+            return
+        sub = self.monitor.hub.subscribe(client[0], factory=lambda cid: AsyncSubscription(cid, loop),
+                                         profile=profile, auto=auto)
+        if sub is None:
+            await self._respond(send, 503, b"Too many viewers")
+            return
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            sub.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"multipart/x-mixed-replace; boundary=" + BOUNDARY)]})
+            while not sub.closed:
+                jpeg = await sub.next(timeout=0.5)
+                if jpeg is None:
+                    continue
+                start = time.perf_counter()
+                await send({"type": "http.response.body", "more_body": True,
+                            "body": b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"})
+                SEND_SECONDS.observe(time.perf_counter() - start)
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            watcher.cancel()
+            self.monitor.hub.unsubscribe(sub)
+
+    async def events(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        client = scope.get("client") or ("client", 0)
+        broadcaster = self.monitor.events
+        listener = broadcaster.subscribe(client[0], factory=lambda cid: AsyncEventListener(cid, loop))
+        if listener is None:
+            await self._respond(send, 503, b"Too many listeners")
+            return
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            listener.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                                    (b"x-accel-buffering", b"no")]})
+            await send({"type": "http.response.body", "body": RETRY, "more_body": True})
+            while not listener.closed:
+                event = await listener.next(timeout=broadcaster.heartbeat)
+                if listener.closed:
+                    break
+                await send({"type": "http.response.body", "body": event or HEARTBEAT, "more_body": True})
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            watcher.cancel()
+            broadcaster.unsubscribe(listener)
+
+
+def serve(app, host="0.0.0.0", port=5000):
+    """Run ``app`` with uvicorn (optional dependency: ``pip install uvicorn``)."""
+    import uvicorn
+    uvicorn.run(app, host=host, port=port, log_level="warning", access_log=False)
@@ -0,0 +1,234 @@
+import cv2
+import itertools
+import logging
+import threading
+import time
+from threading import Thread
+from typing import Optional, Dict, Any, List, Tuple
+
+from pipeline.overlay import OverlayRenderer
+from utils.logger import ThrottledLog
+from utils.metrics import REGISTRY, STAGE_SECONDS, RateMeter
+from .stream_profile import AdaptiveQuality, StreamProfile, auto_ladder, parse_profile
+
+FRAMES_SENT = REGISTRY.counter("beshique_stream_frames_sent_total", "JPEG frames handed to stream clients")
+FRAMES_DROPPED = REGISTRY.counter("beshique_stream_frames_dropped_total",
+                                  "Frames replaced before a slow client took them")
+CLIENTS_REJECTED = REGISTRY.counter("beshique_stream_clients_rejected_total",
+                                    "Stream clients turned away at the viewer limit")
+ENCODE_SECONDS = STAGE_SECONDS.labels(stage="encode")
+
+
+class Subscription:
+    """Single-slot mailbox for one stream client; the newest frame always wins.
+
+    ``profile`` is the StreamProfile the client is fed; in auto mode ``adaptive`` moves it
+    along a ladder from the client's drop ratio.
+    """
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.connected_at = time.time()
+        self.sent = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.closed = False
+        self.profile: Optional[StreamProfile] = None
+        self.adaptive: Optional[AdaptiveQuality] = None
+        self._cond = threading.Condition()
+        self._pending: Optional[bytes] = None
+
+    def offer(self, jpeg: bytes):
+        """Hand a frame to the client, replacing (and counting) any unsent one."""
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+                FRAMES_DROPPED.inc()
+            self._pending = jpeg
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Take the pending frame, waiting up to ``timeout``; None if nothing arrived."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending is not None or self.closed, timeout)
+            jpeg, self._pending = self._pending, None
+            if jpeg is not None:
+                self.sent += 1
+                self.sent_bytes += len(jpeg)
+                FRAMES_SENT.inc()
+            return jpeg
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "client": self.client_id,
+            "connected_for": round(time.time() - self.connected_at, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "profile": f"{self.profile}{' (auto)' if self.adaptive else ''}",
+            "throughput_kbps": round(self.adaptive.throughput * 8 / 1000, 1) if self.adaptive else None,
+        }
+
+
+class BroadcastHub:
+    """Encodes each detection result once per stream profile and fans the bytes out.
+
+    Clients on the same StreamProfile share one resize and encode. Each profile is paced
+    to its own fps, and a profile nobody is watching is dropped on the next result, so
+    it costs nothing. Overlays are rendered by ``renderer`` only when some profile is
+    due a frame, once per result. With no subscribers the hub skips results entirely
+    (and capture skips the main stream), so a headless monitor never draws, resizes or
+    encodes.
+    """
+
+    def __init__(self, results, size=(640, 480), jpeg_quality=50, fps=10, max_subscribers=None, max_fps=None,
+                 renderer=None):
+        self.logger = logging.getLogger("BabyMonitor")
+        self._log = ThrottledLog(self.logger)
+        self.renderer = renderer or OverlayRenderer()
+        self.results = results
+        self.max_subscribers = max_subscribers
+        self.size = size
+        self.jpeg_quality = jpeg_quality
+        self.fps = fps
+        self.max_fps = max_fps or fps
+        self.default_profile = StreamProfile(size[0], size[1], fps, jpeg_quality)
+        self.ladder = auto_ladder(self.default_profile)
+        self._last_sent: Dict[StreamProfile, float] = {}  # profiles in use -> last frame timestamp
+        self._subs_lock = threading.Lock()
+        self._subscribers: List[Subscription] = []
+        self._ids = itertools.count(1)
+        self.output_rate = RateMeter()  # encoded frames per second actually streamed
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._run, name="broadcast-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._subs_lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for sub in subscribers:
+            sub.close()
+
+    def parse_profile(self, query) -> Tuple[StreamProfile, bool]:
+        """``(profile, auto)`` from stream query parameters; ValueError if malformed."""
+        return parse_profile(query, self.default_profile, self.max_fps)
+
+    def subscribe(self, client_id: Optional[str] = None, factory=Subscription,
+                  profile: Optional[StreamProfile] = None, auto=False) -> Optional[Subscription]:
+        """Register a stream client; None when ``max_subscribers`` are already connected.
+
+        ``factory`` builds the mailbox from the client id, e.g. an asyncio-aware one.
+        The client gets ``profile`` (default: the hub's), or with ``auto`` starts at the
+        top of the auto ladder and adapts.
+        """
+        sub = factory(f"{client_id or 'client'}#{next(self._ids)}")
+        if auto:
+            sub.adaptive = AdaptiveQuality(self.ladder, now=time.time())
+            sub.profile = sub.adaptive.profile
+        else:
+            sub.profile = profile or self.default_profile
+        with self._subs_lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                self.logger.warning(f"Stream client rejected, {self.max_subscribers} viewers connected: {sub.client_id}")
+                CLIENTS_REJECTED.inc()
+                return None
+            self._subscribers.append(sub)
+        self.logger.info(f"Stream client connected: {sub.client_id} ({sub.profile}{', auto' if auto else ''})")
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._subs_lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+        self.logger.info(f"Stream client disconnected: {sub.client_id} (sent={sub.sent}, dropped={sub.dropped})")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def client_stats(self) -> List[Dict[str, Any]]:
+        with self._subs_lock:
+            subscribers = list(self._subscribers)
+        return [sub.stats() for sub in subscribers]
+
+    @property
+    def profile_count(self) -> int:
+        return len(self._last_sent)
+
+    def encode(self, frame, profile: Optional[StreamProfile] = None, resized=None) -> Optional[bytes]:
+        """Resize and JPEG-encode one output frame; ``resized`` caches resizes by size."""
+        profile = profile or self.default_profile
+        start = time.perf_counter()
+        size = (profile.width, profile.height)
+        stream_frame = resized.get(size) if resized is not None else None
+        if stream_frame is None:
+            stream_frame = frame if frame.shape[1::-1] == size else cv2.resize(frame, size)
+            if resized is not None:
+                resized[size] = stream_frame
+        ret, jpeg = cv2.imencode('.jpg', stream_frame,
+                                 [int(cv2.IMWRITE_JPEG_QUALITY), profile.quality])
+        ENCODE_SECONDS.observe(time.perf_counter() - start)
+        if not ret:
+            self.logger.error("JPEG encode failed")
+            return None
+        return jpeg.tobytes()
+
+    def _run(self):
+        last_seq = 0
+        while self._running:
+            try:
+                result = self.results.wait_next(last_seq, timeout=0.2)
+                if result is None:
+                    continue
+                last_seq = result.seq
+
+                with self._subs_lock:
+                    subscribers = list(self._subscribers)
+                headless = not subscribers
+                self._log.on_change("headless", headless, "No viewers: overlay, resize and encode skipped"
+                                    if headless else "Viewers connected: streaming resumed")
+                if headless:
+                    self._last_sent.clear()
+                    continue
+                now = time.time()
+                by_profile: Dict[StreamProfile, List[Subscription]] = {}
+                for sub in subscribers:
+                    if sub.adaptive is not None:
+                        sub.profile = sub.adaptive.update(sub.sent, sub.dropped, sub.sent_bytes, now)
+                    by_profile.setdefault(sub.profile, []).append(sub)
+                # Forget profiles nobody watches any more
+                self._last_sent = {p: t for p, t in self._last_sent.items() if p in by_profile}
+                if result.frame is None:
+                    continue
+
+                resized, frame = {}, None
+                for profile, subs in by_profile.items():
+                    # Per-profile pacing on capture time; 10% slack keeps it from skipping
+                    # every other frame when the detection rate equals the profile's fps
+                    if result.timestamp - self._last_sent.get(profile, 0.0) < 0.9 / profile.fps:
+                        continue
+                    if frame is None:
+                        frame = self.renderer.annotated(result)
+                    jpeg = self.encode(frame, profile, resized)
+                    if jpeg is None:
+                        continue
+                    self._last_sent[profile] = result.timestamp
+                    for sub in subs:
+                        sub.offer(jpeg)
+                if resized:
+                    self.output_rate.mark()
+            except Exception as exc:
+                self.logger.error(f"Broadcast loop error: {exc}")
+                time.sleep(1)
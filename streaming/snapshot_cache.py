@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, NamedTuple, Optional
+
+import cv2
+
+from pipeline.overlay import OverlayRenderer
+from pipeline.stats_rollup import etag_matches
+from utils.metrics import REGISTRY, STAGE_SECONDS
+
+SNAPSHOT_REQUESTS = REGISTRY.counter("beshique_snapshot_requests_total",
+                                     "Snapshot requests by response (ok, not_modified, unavailable)", ("outcome",))
+SNAPSHOT_ENCODES = REGISTRY.counter("beshique_snapshot_encodes_total", "Snapshot JPEG encodes")
+SNAPSHOT_SECONDS = STAGE_SECONDS.labels(stage="snapshot")
+# FrameRing seqs restart with every process (including the /setup re-exec), so ETags
+# carry a per-process id and a tag from before a restart never matches a new frame
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class Snapshot(NamedTuple):
+    jpeg: bytes
+    seq: int  # FrameRing seq of the frame
+    timestamp: float  # capture time
+    annotated: bool
+
+    @property
+    def etag(self) -> str:
+        return f'"{BOOT_ID}-{"a" if self.annotated else "r"}{self.seq}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.timestamp, usegmt=True)
+
+    def headers(self) -> Dict[str, str]:
+        return {"ETag": self.etag, "Last-Modified": self.last_modified, "Cache-Control": "no-cache"}
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Conditional GET check; ``If-None-Match`` wins over ``If-Modified-Since`` (RFC 9110)."""
+        if if_none_match:
+            return etag_matches(if_none_match, self.etag)
+        if if_modified_since:
+            try:
+                return int(self.timestamp) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class SnapshotCache:
+    """Newest frame as JPEG, encoded at most once per frame and variant.
+
+    ``get()`` returns the raw camera frame from the FrameRing without taking it from
+    anyone. While nobody streams, capture skips the main frame: a raw request then
+    sets ``wants_main`` for ``main_hold`` seconds and waits up to ``main_wait`` for a
+    full-size frame, else it settles for the lores one.
+
+    ``get(annotated=True)`` returns the newest detection result frame with overlays
+    drawn by ``renderer``, shared with the BroadcastHub so nothing is drawn twice. It
+    falls back to the raw frame when results carry no frame.
+
+    Encoding happens on the first request for a new frame, so nothing is spent when
+    nobody polls; later requests get the cached bytes, conditional ones a 304. A
+    snapshot younger than ``max_age`` is served even if newer frames exist, which caps
+    polling dashboards at ``1 / max_age`` encodes per second between them.
+    """
+
+    def __init__(self, ring, results, quality=70, max_age=0.5, renderer=None, main_hold=5.0, main_wait=0.5):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.ring = ring
+        self.results = results
+        self.renderer = renderer or OverlayRenderer()
+        self.quality = quality
+        self.max_age = max_age
+        self.main_hold = main_hold
+        self.main_wait = main_wait
+        self._main_wanted_until = 0.0
+        self._lock = threading.Lock()
+        self._cache: Dict[bool, Snapshot] = {}
+        self._encoded_at: Dict[bool, float] = {}
+
+    @property
+    def wants_main(self) -> bool:
+        """True while recent raw snapshot requests need the full-size main frame."""
+        return time.monotonic() < self._main_wanted_until
+
+    def _with_main(self, frame):
+        """Ask capture for the main stream and wait briefly for a frame that has it."""
+        self._main_wanted_until = time.monotonic() + self.main_hold
+        deadline = time.monotonic() + self.main_wait
+        while frame.view is None and time.monotonic() < deadline:
+            newer = self.ring.wait_next(frame.seq, timeout=deadline - time.monotonic(), copy_main=False)
+            if newer is None:
+                break
+            frame = newer
+        return frame
+
+    def _fresh(self, annotated) -> Optional[Snapshot]:
+        cached = self._cache.get(annotated)
+        if cached is not None and time.monotonic() - self._encoded_at[annotated] < self.max_age:
+            return cached
+        return None
+
+    def get(self, annotated=False) -> Optional[Snapshot]:
+        if annotated:
+            fresh = self._fresh(True)
+            if fresh is not None:
+                return fresh
+            result = self.results.latest()
+            if result is not None and result.frame is not None and result.frame_seq is not None:
+                return self._cached(True, result.frame_seq, result.timestamp, lambda: self.renderer.annotated(result))
+        fresh = self._fresh(False)
+        if fresh is not None:
+            return fresh
+        seq = self.ring.latest_seq
+        if seq == 0:
+            return None
+        cached = self._cache.get(False)
+        if cached is not None and cached.seq == seq:
+            return cached
+        frame = self.ring.latest(copy_main=False)
+        if frame is None:
+            return cached  # lapped between the two reads; the previous frame is still good
+        if frame.view is None and self.ring.main is not None:
+            frame = self._with_main(frame)
+        return self._cached(False, frame.seq, frame.timestamp, frame.bgr)
+
+    def _cached(self, annotated, seq, timestamp, image) -> Optional[Snapshot]:
+        cached = self._cache.get(annotated)
+        if cached is not None and cached.seq >= seq:
+            return cached
+        # One encode per frame however many requests arrive together
+        with self._lock:
+            cached = self._cache.get(annotated)
+            if cached is not None and cached.seq >= seq:
+                return cached
+            start = time.perf_counter()
+            ok, jpeg = cv2.imencode('.jpg', image(), [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+            SNAPSHOT_SECONDS.observe(time.perf_counter() - start)
+            if not ok:
+                self.logger.error("Snapshot encode failed")
+                return cached
+            if not annotated and not self.ring.is_current(seq % self.ring.slots, seq):
+                # Overwritten while encoding; the image may be torn, keep the last good one
+                return cached
+            snapshot = Snapshot(jpeg.tobytes(), seq, timestamp, annotated)
+            self._cache[annotated] = snapshot
+            self._encoded_at[annotated] = time.monotonic()
+            SNAPSHOT_ENCODES.inc()
+            return snapshot
+
+    def respond(self, annotated=False, if_none_match=None, if_modified_since=None):
+        """``(status, body, headers)`` of a snapshot request, shared by both servers."""
+        snapshot = self.get(annotated)
+        if snapshot is None:
+            SNAPSHOT_REQUESTS.labels(outcome="unavailable").inc()
+            return 503, b"No frame", {}
+        if snapshot.not_modified(if_none_match, if_modified_since):
+            SNAPSHOT_REQUESTS.labels(outcome="not_modified").inc()
+            return 304, b"", snapshot.headers()
+        SNAPSHOT_REQUESTS.labels(outcome="ok").inc()
+        return 200, snapshot.jpeg, snapshot.headers()
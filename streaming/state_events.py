@@ -0,0 +1,195 @@
+"""Server-Sent Events channel for the baby's state.
+
+One publisher thread follows the DetectionWorker's results and emits a small JSON event
+only when the state or the bouncing level changes. Listeners get the current state on
+connect, then only changes, plus an SSE comment as a heartbeat when nothing happened for
+``heartbeat`` seconds. Under the ASGI server (``Config.server_mode = "asgi"``) every
+listener is a coroutine on the event loop, so an all-night phone connection costs no
+thread. The Flask fallback serves each listener from its own request thread, like
+/video_feed, so keep it to a handful of listeners there.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from threading import Thread
+from typing import List, Optional
+
+from utils.metrics import REGISTRY
+
+EVENTS_SENT = REGISTRY.counter("beshique_state_events_total", "State change events published")
+LISTENERS_REJECTED = REGISTRY.counter("beshique_event_listeners_rejected_total",
+                                      "Event listeners turned away at the listener limit")
+
+HEARTBEAT = b": keep-alive\n\n"
+# Ask EventSource clients to reconnect after 5 s instead of the browser default
+RETRY = b"retry: 5000\n\n"
+
+
+def format_event(event_id: int, name: str, data: dict) -> bytes:
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+class EventListener:
+    """Mailbox for one event-stream client; keeps up to ``backlog`` unsent events."""
+
+    def __init__(self, client_id: str, backlog=32):
+        self.client_id = client_id
+        self.connected_at = time.time()
+        self.sent = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self._events: deque = deque(maxlen=backlog)
+
+    def offer(self, event: bytes):
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Take the oldest unsent event, waiting up to ``timeout``; None if there was none."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events or self.closed, timeout)
+            if not self._events:
+                return None
+            self.sent += 1
+            return self._events.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class AsyncEventListener(EventListener):
+    """EventListener awaited on an event loop; the publisher hands events over thread-safely."""
+
+    def __init__(self, client_id: str, loop: asyncio.AbstractEventLoop, backlog=32):
+        super().__init__(client_id, backlog)
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def offer(self, event: bytes):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _deliver(self, event: bytes):
+        self._events.append(event)
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        if not self._events:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        if not self._events:
+            return None
+        self.sent += 1
+        return self._events.popleft()
+
+    def close(self):
+        self.closed = True
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass
+
+
+class StateEventBroadcaster:
+    """Publishes state/bouncing-level changes from the ResultChannel to every listener."""
+
+    def __init__(self, results, heartbeat=15.0, max_listeners=None):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.results = results
+        self.heartbeat = heartbeat
+        self.max_listeners = max_listeners
+        self._listeners_lock = threading.Lock()
+        self._listeners: List[EventListener] = []
+        self._ids = itertools.count(1)
+        self._event_ids = itertools.count(1)
+        self._current = None  # (state, bouncing_level)
+        self._since: Optional[float] = None
+        self.latest_event: Optional[bytes] = None
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._run, name="state-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._listeners_lock:
+            listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener.close()
+
+    def subscribe(self, client_id: Optional[str] = None, factory=EventListener) -> Optional[EventListener]:
+        """Register a listener, primed with the current state; None at ``max_listeners``."""
+        listener = factory(f"{client_id or 'client'}#{next(self._ids)}")
+        with self._listeners_lock:
+            if self.max_listeners is not None and len(self._listeners) >= self.max_listeners:
+                self.logger.warning(f"Event listener rejected, {self.max_listeners} connected: {listener.client_id}")
+                LISTENERS_REJECTED.inc()
+                return None
+            self._listeners.append(listener)
+            # Under the lock, so a change published meanwhile cannot arrive before it
+            if self.latest_event is not None:
+                listener.offer(self.latest_event)
+        self.logger.info(f"Event listener connected: {listener.client_id}")
+        return listener
+
+    def unsubscribe(self, listener: EventListener):
+        listener.close()
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+        self.logger.info(f"Event listener disconnected: {listener.client_id} (sent={listener.sent})")
+
+    @property
+    def listener_count(self) -> int:
+        return len(self._listeners)
+
+    def _run(self):
+        last_seq = 0
+        while self._running:
+            try:
+                result = self.results.wait_next(last_seq, timeout=0.5)
+                if result is None:
+                    continue
+                last_seq = result.seq
+                self.observe(result)
+            except Exception as exc:
+                self.logger.error(f"State event loop error: {exc}")
+                time.sleep(1)
+
+    def observe(self, result):
+        """Publish an event if ``result`` changes the state or the bouncing level."""
+        current = (result.state, result.bouncing_level)
+        if current == self._current:
+            return
+        if self._current is None or current[0] != self._current[0]:
+            self._since = result.timestamp
+        self._current = current
+        event = format_event(next(self._event_ids), "state", {
+            "state": result.state,
+            "bouncing_level": result.bouncing_level,
+            "since": round(self._since, 3),
+            "timestamp": round(result.timestamp, 3),
+        })
+        with self._listeners_lock:
+            self.latest_event = event
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener.offer(event)
+        EVENTS_SENT.inc()
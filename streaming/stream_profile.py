@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Tuple
+
+# (size, fps, quality) factors of the default profile, best first, for auto mode
+AUTO_STEPS = ((1.0, 1.0, 1.0), (0.75, 0.8, 0.9), (0.5, 0.5, 0.8), (0.375, 0.3, 0.7), (0.25, 0.2, 0.6))
+MIN_WIDTH, MIN_QUALITY, MAX_QUALITY = 96, 10, 95
+
+
+@dataclass(frozen=True)
+class StreamProfile:
+    """Output size, frame rate and JPEG quality of a stream; equal profiles share one encode."""
+    width: int
+    height: int
+    fps: float
+    quality: int
+
+    def __str__(self):
+        return f"{self.width}x{self.height}@{self.fps:g}fps q{self.quality}"
+
+    def scaled(self, size=1.0, fps=1.0, quality=1.0) -> "StreamProfile":
+        width = max(MIN_WIDTH, int(self.width * size) // 16 * 16)
+        return StreamProfile(width, round(width * self.height / self.width / 2) * 2,
+                             max(1.0, round(self.fps * fps)),
+                             max(MIN_QUALITY, int(self.quality * quality) // 5 * 5))
+
+
+def auto_ladder(default: StreamProfile) -> List[StreamProfile]:
+    return [default.scaled(*step) for step in AUTO_STEPS]
+
+
+def parse_profile(query: Mapping[str, str], default: StreamProfile, max_fps: float) -> Tuple[StreamProfile, bool]:
+    """Profile requested by ``?w=320&h=240&fps=5&q=40`` (any subset), and whether ``?auto=1`` was asked.
+
+    Values are clamped to the default size and ``max_fps``, and rounded (width to 16
+    pixels, quality to 5) so similar requests land on a shared profile. Raises
+    ValueError for non-numeric values.
+    """
+    auto = query.get("auto", "").lower() in ("1", "true", "yes") or query.get("mode") == "auto"
+    width = int(query["w"]) if query.get("w") else None
+    height = int(query["h"]) if query.get("h") else None
+    if width is None and height is None:
+        width, height = default.width, default.height
+    elif width is None:
+        width = height * default.width // default.height  # keep the aspect ratio
+    elif height is None:
+        width = min(default.width, max(MIN_WIDTH, width)) // 16 * 16
+        height = width * default.height // default.width
+    width = min(default.width, max(MIN_WIDTH, width)) // 16 * 16
+    height = min(default.height, max(2, height)) // 2 * 2
+    fps = min(max_fps, max(1.0, float(query["fps"]))) if query.get("fps") else default.fps
+    quality = int(query["q"]) if query.get("q") else default.quality
+    quality = min(MAX_QUALITY, max(MIN_QUALITY, quality)) // 5 * 5
+    return StreamProfile(width, height, round(fps, 1), quality), auto
+
+
+class AdaptiveQuality:
+    """Walks one client along an auto ladder using its send backpressure.
+
+    A frame replaced before the client took it means the connection (or the client)
+    could not keep up. Over each ``window`` the drop ratio is checked: above
+    ``down_ratio`` the client steps one profile down, and after ``up_after`` seconds
+    without drops it steps one back up. Delivered bytes per second are kept as the
+    client's measured throughput.
+    """
+
+    def __init__(self, ladder: List[StreamProfile], window=3.0, down_ratio=0.2, up_after=20.0,
+                 now: Optional[float] = None):
+        self.ladder = ladder
+        self.window = window
+        self.down_ratio = down_ratio
+        self.up_after = up_after
+        self.level = 0
+        self.throughput = 0.0  # bytes/s delivered over the last window
+        self._window_start = now or 0.0
+        self._clean_since = now or 0.0
+        self._counts = (0, 0, 0)
+
+    @property
+    def profile(self) -> StreamProfile:
+        return self.ladder[self.level]
+
+    def update(self, sent: int, dropped: int, sent_bytes: int, now: float) -> StreamProfile:
+        if now - self._window_start < self.window:
+            return self.profile
+        elapsed = now - self._window_start
+        d_sent, d_dropped, d_bytes = (sent - self._counts[0], dropped - self._counts[1],
+                                      sent_bytes - self._counts[2])
+        self._counts = (sent, dropped, sent_bytes)
+        self._window_start = now
+        self.throughput = d_bytes / elapsed
+        offered = d_sent + d_dropped
+        ratio = d_dropped / offered if offered else 0.0
+        if ratio > self.down_ratio and self.level < len(self.ladder) - 1:
+            self.level += 1
+            self._clean_since = now
+        elif d_dropped:
+            self._clean_since = now
+        elif self.level > 0 and now - self._clean_since >= self.up_after:
+            self.level -= 1
+            self._clean_since = now
+        return self.profile
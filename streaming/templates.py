@@ -0,0 +1,66 @@
+"""HTML pages shared by the Flask and ASGI servers (Jinja2 syntax, plain URLs)."""
+from jinja2 import Environment
+
+INDEX_HTML = """
+<html><head><title>Beshique Monitor</title></head>
+<body style='text-align:center;font-family:Arial'>
+    <h2>Beshique Baby Monitor</h2>
+    <img src="/video_feed" width="640" height="480"/>
+    <p><a href="/statistics">Statistics</a> |
+       <a href="/snapshot.jpg">Snapshot</a> |
+       <a href="/setup">Wi-Fi Setup</a></p>
+</body></html>
+"""
+
+STATISTICS_HTML = """
+<html><head><title>Stats</title></head>
+<body style='text-align:center;font-family:Arial'>
+    <h2>Last 24 hours (seconds)</h2>
+    {% for k, v in stats.items() %}<p>{{ k }}: {{ v }}</p>{% endfor %}
+    <h3>Nights</h3>
+    {% for n in nights %}<p>{{ n.night }}: {% for k, v in n.groups.items() %}{{ k }} {{ v }}s{% if not loop.last %}, {% endif %}{% endfor %}</p>
+    {% else %}<p>No history yet</p>{% endfor %}
+    <h3>Stream clients</h3>
+    {% for c in clients %}<p>{{ c.client }}: {{ c.profile }}, sent {{ c.sent }}, dropped {{ c.dropped }}{% if c.throughput_kbps is not none %}, {{ c.throughput_kbps }} kbit/s{% endif %}</p>
+    {% else %}<p>None</p>{% endfor %}
+    <h3>Detector rates (Hz)</h3>
+    {% for k, v in rates.items() %}<p>{{ k }}: {{ v }}</p>{% endfor %}
+    <h3>Pipeline ({{ mode }} mode)</h3>
+    {% for k, v in throughput.items() %}<p>{{ k }}: {{ v }}</p>{% endfor %}
+    <p><a href="/">Back</a></p>
+</body></html>"""
+
+SETUP_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Wi-Fi Setup</title>
+    <style>
+        body { font-family: Arial, sans-serif; background-color: #f4f4f4; text-align: center; padding-top: 50px; }
+        form { display: inline-block; text-align: left; }
+        input { margin: 10px 0; padding: 5px; width: 200px; }
+        input[type="submit"] { background-color: #4CAF50; color: white; border: none; padding: 10px; cursor: pointer; }
+    </style>
+</head>
+<body>
+    <h1>Setup Wi-Fi</h1>
+    <form method="post">
+        <label>Wi-Fi Name (SSID):</label><br>
+        <input type="text" name="ssid" required><br>
+        <label>Password:</label><br>
+        <input type="password" name="password" required><br>
+        <input type="submit" value="Connect">
+    </form>
+</body>
+</html>
+"""
+
+_env = Environment(autoescape=True)
+_compiled = {}
+
+
+def render(template: str, **context) -> str:
+    """Render one of the templates above outside Flask (compiled once per template)."""
+    if template not in _compiled:
+        _compiled[template] = _env.from_string(template)
+    return _compiled[template].render(**context)
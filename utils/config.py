@@ -1,7 +1,76 @@
+import logging
+import os
+
+
+def lores_size(width, height):
+    """Round a YUV420 lores size up to a width the camera stores without row padding.
+
+    The lores stream's row stride is padded to 64 bytes; the detectors slice its I420
+    planes assuming stride == width, so the width must be a multiple of 64 (and the
+    height even for the half-height chroma planes).
+    """
+    size = (-(-width // 64) * 64, height + height % 2)
+    if size != (width, height):
+        logging.getLogger("BabyMonitor").warning(
+            f"detection_resolution {width}x{height} rounded up to {size[0]}x{size[1]}")
+    return size
+
+
 class Config:
     def __init__(self):
         # Resolution optimized for Raspberry Pi streaming
         self.resolution = (640, 480)  # Lowered from (640, 480) for performance
+        # Lores YUV stream fed to the detectors; the width is rounded up to a multiple of 64
+        self.detection_resolution = lores_size(320, 240)
         self.enable_night_mode = True
-        self.detection_interval = 0.1
-        # Add more configuration parameters as needed
\ No newline at end of file
+        self.detection_interval = 0.1  # Base (full-rate) interval for every detector
+        # Slower intervals once the baby is stably calm; activity bursts back to full rate
+        self.calm_detector_intervals = {"eyes": 0.75}
+        self.scheduler_stable_after = 60.0
+        self.scheduler_burst_duration = 10.0
+        # Run FaceMesh on a crop around the last face; full-frame search at least this often
+        self.face_tracking = True
+        self.face_reacquire_interval = 5.0
+        # "gaussian" (reference) or "decimated"; see benchmarks/bench_motion.py for the
+        # speed vs motion-percentage drift of each decimation factor on your camera
+        self.motion_engine = "gaussian"
+        self.motion_decimation = 4
+        # Frame ring slots; a reader must be done with a frame within this many frame periods
+        self.frame_ring_slots = 4
+        # "thread" runs every detector in the detection thread; "process" moves the ones in
+        # process_detectors ("eyes", "motion") to worker processes (frames via shared
+        # memory) to use all cores. Sound stays in-process: the recorders read its audio ring
+        self.execution_mode = "thread"
+        self.process_detectors = ("eyes",)
+        # "flask" (a thread per connection) or "asgi" (one event loop, needs uvicorn)
+        self.server_mode = "flask"
+        self.max_viewers = 10  # Concurrent /video_feed clients; more get a 503
+        # Highest fps a client may ask for with /video_feed?fps=; ?w=&h=&q= are capped at
+        # the stream size and 95, and ?auto=1 adapts to the client's connection
+        self.stream_max_fps = 15.0
+        # /events (Server-Sent Events): state changes plus a heartbeat when idle
+        self.event_heartbeat = 15.0
+        self.max_event_listeners = 50
+        # Record a session (frames + audio) to this file, or replay one instead of the
+        # camera and microphone; speed 1.0 is real time, 0 as fast as possible
+        self.record_path = os.environ.get("BESHIQUE_RECORD")
+        self.record_main = False  # Also store full-size frames (much larger files)
+        self.replay_path = os.environ.get("BESHIQUE_REPLAY")
+        self.replay_speed = float(os.environ.get("BESHIQUE_REPLAY_SPEED", "1.0"))
+        self.replay_loop = True
+        # Clips around each switch into a trigger state: pre_roll seconds before, post_roll
+        # after. Off unless BESHIQUE_CLIP_DIR is set (it encodes frames all night)
+        self.clip_dir = os.environ.get("BESHIQUE_CLIP_DIR")
+        self.clip_trigger_states = ("Crying", "Active")
+        self.clip_pre_roll = 10.0
+        self.clip_post_roll = 20.0
+        self.clip_fps = 10.0
+        self.clip_max_count = 50
+        self.clip_max_bytes = 500 * 1024 * 1024
+        # State history (SQLite); replays keep theirs in memory. Raw transitions and
+        # feature samples are kept state_retention_days, hourly rollups much longer
+        self.state_db_path = os.environ.get("BESHIQUE_STATE_DB", "state_history.db")
+        self.state_sample_interval = 5.0
+        self.state_retention_days = 14
+        self.night_hours = (19, 7)  # Local hours a night starts and ends
+        # Add more configuration parameters as needed
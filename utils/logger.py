@@ -1,16 +1,85 @@
+import atexit
 import logging
-from datetime import datetime
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOGGER_NAME = 'BabyMonitor'
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+_filename = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` formats the record in the calling thread so it can be
+    pickled; this queue never leaves the process, so the record goes as it is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _start_listener(handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _after_fork_in_child():
+    """Detector worker processes: fresh queue and writer thread, no rotation of their own.
+
+    A forked child has no listener thread and may inherit the queue's lock held, so the
+    handler gets a new queue. Only the parent rotates the file; the child's
+    WatchedFileHandler reopens it after a rotation instead.
+    """
+    if _queue_handler is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    handler = logging.handlers.WatchedFileHandler(_filename)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    _start_listener(handler)
+
+
+def shutdown():
+    """Flush queued records to disk and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
 
 class Logger:
-    def __init__(self, filename='baby_monitor.log'):  # Adjust path for Pi
-        self.logger = logging.getLogger('BabyMonitor')
+    """Front end for the 'BabyMonitor' logger.
+
+    Records are queued and written by a background thread to a size-rotated file,
+    so callers on the frame path never wait for the SD card. The handlers are set
+    up once per process; later ``Logger()`` calls reuse them.
+    """
+
+    def __init__(self, filename='baby_monitor.log', max_bytes=2 * 1024 * 1024, backup_count=3):  # Adjust path for Pi
+        global _queue_handler, _filename
+        self.logger = logging.getLogger(LOGGER_NAME)
         self.logger.setLevel(logging.INFO)
-        
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        
-        file_handler = logging.FileHandler(filename)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+
+        with _lock:
+            if _queue_handler is None:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    filename, maxBytes=max_bytes, backupCount=backup_count)
+                file_handler.setFormatter(logging.Formatter(FORMAT))
+                _filename = os.path.abspath(filename)
+                _queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+                self.logger.addHandler(_queue_handler)
+                _start_listener(file_handler)
+                atexit.register(shutdown)
+                os.register_at_fork(after_in_child=_after_fork_in_child)
 
     def info(self, message):
         self.logger.info(message)
@@ -20,3 +89,48 @@ class Logger:
 
     def warning(self, message):
         self.logger.warning(message)
+
+    def close(self):
+        shutdown()
+
+
+class ThrottledLog:
+    """Keeps repeated per-frame messages out of the log.
+
+    ``on_change`` logs a keyed value only when it differs from the last one logged.
+    ``every`` logs a keyed message at most once per ``interval`` seconds; the next
+    one that gets through says how many were suppressed in between.
+    """
+
+    def __init__(self, logger=None, interval=10.0):
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+        self.interval = interval
+        self._values = {}
+        self._last = {}
+        self._suppressed = {}
+
+    def on_change(self, key, value, message, level=logging.INFO):
+        if self._values.get(key, self) == value:
+            return False
+        self._values[key] = value
+        self.logger.log(level, message)
+        return True
+
+    def every(self, key, message, level=logging.WARNING, now=None):
+        now = now if now is not None else time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar messages suppressed)"
+        self.logger.log(level, message)
+        return True
+
+    def reset(self, key):
+        """Forget ``key`` so its next message is logged immediately."""
+        self._values.pop(key, None)
+        self._last.pop(key, None)
+        self._suppressed.pop(key, None)
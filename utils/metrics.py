@@ -0,0 +1,216 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Tuple
+
+from .rolling_window import RollingWindow
+
+# Seconds; spans a cheap counter update up to a stalled FaceMesh run or network send
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _Metric:
+    """One metric family. Labelled families hand out one child per label-value tuple."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str = "", labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels) -> "_Metric":
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def _child(self) -> "_Metric":
+        return type(self)(self.name, self.help)
+
+    def _samples(self):
+        """``(suffix, extra label pairs, value)`` of this unlabelled metric."""
+        raise NotImplementedError
+
+    def collect(self):
+        if not self.labelnames:
+            return list(self._samples())
+        samples = []
+        for key, child in sorted(self._children.items()):
+            pairs = tuple(zip(self.labelnames, key))
+            samples.extend((suffix, pairs + extra, value) for suffix, extra, value in child._samples())
+        return samples
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text="", labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def _samples(self):
+        return [("", (), self.value)]
+
+
+class Gauge(_Metric):
+    """Settable value, or one read from ``set_function`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text="", labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def _samples(self):
+        value = self.value
+        if self._function is not None:
+            try:
+                value = float(self._function())
+            except Exception:
+                value = float("nan")
+        return [("", (), value)]
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram: ``observe`` is a bisect and three additions under a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """``with histogram.time():`` observes the block's duration in seconds."""
+        return _Timer(self)
+
+    def _samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        samples, cumulative = [], 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            samples.append(("_bucket", (("le", repr(float(bound))),), cumulative))
+        samples.append(("_bucket", (("le", "+Inf"),), count))
+        samples.append(("_sum", (), total))
+        samples.append(("_count", (), count))
+        return samples
+
+
+class RateMeter:
+    """Events per second over a sliding window, e.g. an effective frame rate."""
+
+    def __init__(self, window: float = 5.0):
+        self._window = RollingWindow(window)
+        self._lock = threading.Lock()
+
+    def mark(self, now: Optional[float] = None):
+        with self._lock:
+            self._window.add(now if now is not None else time.time(), 1.0)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        with self._lock:
+            self._window.expire(now if now is not None else time.time())
+            span = self._window.span
+            return (len(self._window) - 1) / span if span > 0 else 0.0
+
+
+def _format_value(value) -> str:
+    if value != value:
+        return "NaN"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """Named metric families rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text="", labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text="", labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text="", labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, pairs, value in metric.collect():
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                lines.append(f"{metric.name}{suffix}{{{labels}}} {_format_value(value)}" if labels
+                             else f"{metric.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Shared by every stage of the pipeline: capture, detectors, classify, overlay, encode, send
+STAGE_SECONDS = REGISTRY.histogram("beshique_stage_seconds", "Time spent per pipeline stage", ("stage",))
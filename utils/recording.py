@@ -0,0 +1,208 @@
+import json
+import logging
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+MAGIC = b"BSQREC1\n"
+# kind (1 byte), capture timestamp (float64), payload length (uint32)
+_RECORD = struct.Struct("<cdI")
+LORES, MAIN, AUDIO = b"L", b"M", b"A"
+
+
+class Record(NamedTuple):
+    kind: bytes
+    timestamp: float
+    data: np.ndarray  # lores I420 (uint8, 2-D), main BGR, or int16 PCM samples
+
+
+def write_header(file, header: dict):
+    """Start a recording file: magic, then the length-prefixed JSON ``header``."""
+    encoded = json.dumps(header).encode("utf-8")
+    file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+
+
+def write_record(file, kind: bytes, timestamp: float, payload: bytes):
+    file.write(_RECORD.pack(kind, timestamp, len(payload)))
+    file.write(payload)
+
+
+class SessionRecorder:
+    """Writes a monitoring session (camera frames and microphone audio) to one file.
+
+    The format is an 8-byte magic, then a length-prefixed JSON header, then records of
+    ``kind, timestamp, length, payload``. Lores frames are stored as single-channel
+    JPEG of the packed I420 array. Main frames, recorded only with ``record_main``, are
+    BGR JPEG. Audio is raw little-endian int16 PCM.
+
+    The recorder is just another reader. It follows the FrameRing and its own audio-ring
+    cursor from a background thread, so capture is never slowed down. Frames it cannot
+    keep up with are skipped; their timestamps keep the recorded spacing honest.
+    """
+
+    def __init__(self, path, ring, audio_ring=None, audio_rate=44100, audio_channels=1,
+                 chunk_size=1024, jpeg_quality=90, record_main=False):
+        self.logger = logging.getLogger("BabyMonitor")
+        self.path = path
+        self.ring = ring
+        self.audio_ring = audio_ring
+        self.audio_rate = audio_rate
+        self.chunk_size = chunk_size
+        self.jpeg_quality = jpeg_quality
+        self.record_main = record_main
+        self.frames = 0
+        self.audio_samples = 0
+        self._file = open(path, "wb")
+        header = {
+            "version": 1,
+            "lores_shape": list(ring.lores_shape),
+            "main_shape": list(ring.main_shape) if ring.main_shape else None,
+            "audio_rate": audio_rate,
+            "audio_channels": audio_channels,
+            "chunk_size": chunk_size,
+            "started": time.time(),
+        }
+        write_header(self._file, header)
+        self._audio_pos = audio_ring.write_pos if audio_ring is not None else 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Recording session to {self.path}")
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if not self._file.closed:
+            self._file.close()
+        self.logger.info(f"Recording stopped: {self.frames} frames, "
+                         f"{self.audio_samples / self.audio_rate:.1f}s audio")
+
+    def _write(self, kind: bytes, timestamp: float, payload: bytes):
+        write_record(self._file, kind, timestamp, payload)
+
+    def _run(self):
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        last_seq = 0
+        while self._running:
+            try:
+                self._drain_audio()
+                ctx = self.ring.wait_next(last_seq, timeout=0.05, copy_main=False)
+                if ctx is None:
+                    continue
+                last_seq = ctx.seq
+                # Encode before checking the slot is still ours: a lapped frame is dropped
+                lores = cv2.imencode(".jpg", ctx.lores_yuv, params)[1]
+                main = None
+                if self.record_main and ctx.view is not None:
+                    main = cv2.imencode(".jpg", ctx.view, params)[1]
+                if not self.ring.is_current(ctx.slot, ctx.seq):
+                    continue
+                # Main first: a replay holds it until the lores record completes the frame
+                if main is not None:
+                    self._write(MAIN, ctx.timestamp, main.tobytes())
+                self._write(LORES, ctx.timestamp, lores.tobytes())
+                self.frames += 1
+            except Exception as exc:
+                self.logger.error(f"Session recorder error: {exc}")
+                time.sleep(1)
+
+    def _drain_audio(self):
+        if self.audio_ring is None:
+            return
+        samples, self._audio_pos, lost = self.audio_ring.read_since(self._audio_pos, self.chunk_size)
+        if lost:
+            self.logger.warning(f"Session recorder: {lost} audio samples lost")
+        if len(samples):
+            # The ring has no timestamps: the newest sample was captured about now
+            end = time.time()
+            for i, chunk in enumerate(samples.reshape(-1, self.chunk_size)):
+                remaining = len(samples) - (i + 1) * self.chunk_size
+                self._write(AUDIO, end - remaining / self.audio_rate, chunk.astype("<i2").tobytes())
+            self.audio_samples += len(samples)
+
+
+class SessionReader:
+    """Reads a file written by SessionRecorder; ``header`` holds its metadata."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a session recording")
+        (length,) = struct.unpack("<I", self._file.read(4))
+        self.header = json.loads(self._file.read(length).decode("utf-8"))
+        self._data_start = self._file.tell()
+
+    def rewind(self):
+        self._file.seek(self._data_start)
+
+    def __iter__(self) -> Iterator[Record]:
+        return self
+
+    def __next__(self) -> Record:
+        head = self._file.read(_RECORD.size)
+        if len(head) < _RECORD.size:
+            raise StopIteration
+        kind, timestamp, length = _RECORD.unpack(head)
+        payload = self._file.read(length)
+        if len(payload) < length:
+            raise StopIteration  # truncated by a crash mid-write
+        if kind == AUDIO:
+            data = np.frombuffer(payload, dtype="<i2").astype(np.int16)
+        elif kind == LORES and self.header.get("lores_format") == "bgr":
+            # Clips store viewable BGR lores frames; replay expects I420
+            data = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            data = cv2.cvtColor(data, cv2.COLOR_BGR2YUV_I420)
+        else:
+            flags = cv2.IMREAD_GRAYSCALE if kind == LORES else cv2.IMREAD_COLOR
+            data = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), flags)
+        return Record(kind, timestamp, data)
+
+    def close(self):
+        self._file.close()
+
+
+class ReplayClock:
+    """Maps recording time onto the replay's wall clock.
+
+    ``speed`` 1.0 is real time and 2.0 twice as fast. With ``speed`` 0 the replay runs
+    as fast as possible and nothing waits. Replayed timestamps start at the replay's
+    wall time, keeping the recorded spacing; detectors only use differences, so
+    results do not depend on when the replay ran.
+    """
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self._origin = None  # (recording time, replay timestamp) of the first record
+        self._wall_start = None
+
+    def timestamp(self, recorded: float) -> float:
+        """Replay timestamp of a record captured at ``recorded``."""
+        if self._origin is None:
+            self._origin = (recorded, time.time())
+            self._wall_start = time.monotonic()
+        return self._origin[1] + (recorded - self._origin[0])
+
+    def rebase(self, recorded: float, timestamp: float):
+        """Continue a looped replay: ``recorded`` now maps to ``timestamp``."""
+        elapsed = timestamp - self._origin[1]
+        self._origin = (recorded - elapsed, self._origin[1])
+
+    def wait_until(self, timestamp: float):
+        """Sleep until the record at replay ``timestamp`` is due (no-op when unpaced)."""
+        if self.speed <= 0 or self._origin is None:
+            return
+        due = self._wall_start + (timestamp - self._origin[1]) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,136 @@
+from collections import deque
+
+import numpy as np
+
+
+class RollingWindow:
+    """Time-windowed statistics over ``(timestamp, value)`` samples in amortised O(1).
+
+    Samples live in a preallocated array ring. Running sums give count, sum, mean and a
+    least-squares slope (value units per second); monotonic deques give min and max.
+    Timestamps are stored relative to an origin that is moved to the oldest sample every
+    ``capacity`` evictions, when the sums are recomputed, so float error cannot build up
+    over a night of updates. If more than ``capacity`` samples fall inside the window,
+    the oldest are evicted early.
+    """
+
+    def __init__(self, window_duration: float, capacity: int = 1024):
+        self.window_duration = window_duration
+        self.capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._v = np.zeros(capacity, dtype=np.float64)
+        self.clear()
+
+    def clear(self):
+        self._start = 0  # absolute sequence number of the oldest sample
+        self._end = 0    # absolute sequence number of the next sample
+        self._origin = None
+        self._evictions = 0
+        self._sv = self._st = self._stt = self._stv = 0.0
+        self._min_q = deque()
+        self._max_q = deque()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def add(self, timestamp: float, value: float):
+        """Append a sample and evict everything older than ``window_duration`` before it."""
+        if len(self) == self.capacity:
+            self._evict()
+        if self._origin is None:
+            self._origin = timestamp
+        value = float(value)
+        x = timestamp - self._origin
+        i = self._end % self.capacity
+        self._t[i] = x
+        self._v[i] = value
+        self._sv += value
+        self._st += x
+        self._stt += x * x
+        self._stv += x * value
+
+        while self._max_q and self._v[self._max_q[-1] % self.capacity] <= value:
+            self._max_q.pop()
+        self._max_q.append(self._end)
+        while self._min_q and self._v[self._min_q[-1] % self.capacity] >= value:
+            self._min_q.pop()
+        self._min_q.append(self._end)
+        self._end += 1
+
+        self.expire(timestamp)
+
+    def expire(self, now: float):
+        """Evict samples older than ``window_duration`` relative to ``now``."""
+        if self._origin is None:
+            return
+        cutoff = now - self._origin - self.window_duration
+        while len(self) and self._t[self._start % self.capacity] < cutoff:
+            self._evict()
+        if self._evictions >= self.capacity:
+            self._rebase()
+
+    def _evict(self):
+        i = self._start % self.capacity
+        x, value = self._t[i], self._v[i]
+        self._sv -= value
+        self._st -= x
+        self._stt -= x * x
+        self._stv -= x * value
+        if self._max_q and self._max_q[0] == self._start:
+            self._max_q.popleft()
+        if self._min_q and self._min_q[0] == self._start:
+            self._min_q.popleft()
+        self._start += 1
+        self._evictions += 1
+
+    def _rebase(self):
+        """Move the time origin to the oldest sample and recompute the running sums."""
+        self._evictions = 0
+        n = len(self)
+        if n == 0:
+            self._origin = None
+            self._sv = self._st = self._stt = self._stv = 0.0
+            return
+        idx = np.arange(self._start, self._end) % self.capacity
+        shift = self._t[idx[0]]
+        self._t[idx] -= shift
+        self._origin += shift
+        t, v = self._t[idx], self._v[idx]
+        self._sv = float(v.sum())
+        self._st = float(t.sum())
+        self._stt = float(np.dot(t, t))
+        self._stv = float(np.dot(t, v))
+
+    @property
+    def sum(self) -> float:
+        return self._sv if len(self) else 0.0
+
+    @property
+    def mean(self) -> float:
+        return self._sv / len(self) if len(self) else 0.0
+
+    @property
+    def min(self) -> float:
+        return float(self._v[self._min_q[0] % self.capacity]) if self._min_q else 0.0
+
+    @property
+    def max(self) -> float:
+        return float(self._v[self._max_q[0] % self.capacity]) if self._max_q else 0.0
+
+    @property
+    def span(self) -> float:
+        """Seconds between the oldest and newest sample in the window."""
+        if len(self) < 2:
+            return 0.0
+        return float(self._t[(self._end - 1) % self.capacity] - self._t[self._start % self.capacity])
+
+    @property
+    def slope(self) -> float:
+        """Least-squares slope of value over time; 0 with fewer than two distinct timestamps."""
+        n = len(self)
+        if n < 2:
+            return 0.0
+        denominator = n * self._stt - self._st * self._st
+        if denominator <= 1e-12 * max(1.0, n * self._stt):
+            return 0.0
+        return (n * self._stv - self._st * self._sv) / denominator